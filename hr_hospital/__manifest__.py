@@ -1,6 +1,6 @@
 {
     "name": "HR Hospital",
-    "version": "17.0.1.0.0",
+    "version": "17.0.1.2.0",
     "depends": ["base", "web"],
     "author": "Paul",
     "category": "Human Resources",
@@ -12,16 +12,22 @@
         "security/hr_hospital_security.xml",
         "security/hr_hospital_rules.xml",
         "security/ir.model.access.csv",
+        "data/hr_hospital_cron.xml",
         "report/report_doctor.xml",
         "report/report_doctor_template.xml",
+        "report/diagnosis_analysis_views.xml",
         "views/diagnosis_views.xml",
         "views/hr_hospital_menu.xml",
         "views/specialty_views.xml",
         "views/visit_views.xml",
         "wizards/patient_doctor_update_wizard_view.xml",
         "wizards/diagnosis_report_wizard_view.xml",
+        "wizards/import_wizard_view.xml",
+        "views/import_job_views.xml",
         "views/doctor_views.xml",
         "views/patient_views.xml",
+        "views/patient_duplicate_views.xml",
+        "report/report_job_views.xml",
         "views/disease_views.xml",
     ],
     "demo": [
@@ -0,0 +1,149 @@
+import json
+import tempfile
+
+from odoo import _, api, http
+from odoo.exceptions import AccessError
+from odoo.http import request
+from odoo.modules.registry import Registry
+from werkzeug.exceptions import BadRequest
+from werkzeug.http import quote_etag
+from werkzeug.wsgi import wrap_file
+
+
+class HospitalProfilingController(http.Controller):
+    """
+    Lightweight JSON endpoint exposing the hospital profiling statistics.
+    """
+
+    @http.route("/hr_hospital/profiling", type="json", auth="user")
+    def profiling_stats(self, reset=False):
+        """
+        Return the statistics recorded by the current worker.
+
+        Args:
+            reset (bool): Forget the statistics once they are returned.
+
+        Returns:
+            dict: Whether profiling is enabled and the per-method statistics.
+        """
+        if not request.env.user.has_group("hr_hospital.group_admin"):
+            raise AccessError(
+                _("Only hospital administrators can read profiling data.")
+            )
+        profiler = request.env["hr.hospital.profiler"]
+        stats = profiler.get_stats()
+        if reset:
+            profiler.reset_stats()
+        return {"enabled": profiler._is_enabled(), "stats": stats}
+
+
+class HospitalCalendarController(http.Controller):
+    """
+    Calendar feed of the hospital visits, bounded to the displayed window.
+    """
+
+    @http.route(
+        "/hr_hospital/visit/calendar", type="http", auth="user", methods=["GET"]
+    )
+    def visit_calendar(self, start, stop, doctor_ids=None):
+        """
+        Return the visits planned within a calendar window as JSON.
+
+        The response carries an ETag; when the client sends it back in
+        If-None-Match and nothing changed in the window, an empty
+        "304 Not Modified" response is returned without reading the events.
+
+        Args:
+            start (str): Start of the window, as a UTC datetime string.
+            stop (str): End of the window, as a UTC datetime string.
+            doctor_ids (str): Comma-separated ids of the doctors to show.
+
+        Returns:
+            Response: The list of calendar events.
+        """
+        Visit = request.env["hr.hospital.visit"]
+        try:
+            doctors = [int(value) for value in (doctor_ids or "").split(",") if value]
+            etag = Visit._get_calendar_etag(start, stop, doctors)
+        except ValueError as error:
+            raise BadRequest(str(error)) from error
+        headers = [("ETag", quote_etag(etag)), ("Cache-Control", "private, no-cache")]
+        if etag in request.httprequest.if_none_match:
+            return request.make_response("", headers=headers, status=304)
+        visits = Visit._search_calendar(start, stop, doctors)
+        return request.make_json_response(visits._read_calendar(), headers=headers)
+
+
+class HospitalExportController(http.Controller):
+    """
+    Streaming CSV and XLSX downloads of diagnoses and visits.
+    """
+
+    _mimetypes = {
+        "csv": "text/csv; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+
+    @http.route(
+        "/hr_hospital/export/<string:kind>",
+        type="http",
+        auth="user",
+        methods=["GET"],
+    )
+    def export(self, kind, domain="[]", format="csv"):  # pylint: disable=redefined-builtin
+        """
+        Download the records of `domain` as a CSV or XLSX file.
+
+        CSV rows are streamed to the client chunk by chunk while they are
+        read, from a dedicated cursor that outlives the request's one. XLSX is
+        written chunk by chunk to a temporary file, then streamed from disk.
+
+        Args:
+            kind (str): "diagnosis" or "visit".
+            domain (str): JSON domain of the exported records.
+            format (str): "csv" or "xlsx".
+
+        Returns:
+            Response: The file download.
+        """
+        if format not in self._mimetypes:
+            raise BadRequest(_("Unknown format: %s", format))
+        try:
+            domain = json.loads(domain)
+        except ValueError as error:
+            raise BadRequest(str(error)) from error
+        exporter = request.env["hr.hospital.export"]
+        model = exporter._check_kind(kind)
+        # fail early on an invalid domain or missing access rights
+        model.search_count(domain, limit=1)
+        headers = [
+            ("Content-Type", self._mimetypes[format]),
+            (
+                "Content-Disposition",
+                http.content_disposition(f"{kind}_export.{format}"),
+            ),
+        ]
+        if format == "xlsx":
+            fileobj = tempfile.TemporaryFile()
+            exporter.write_xlsx(kind, domain, fileobj)
+            fileobj.seek(0)
+            return request.make_response(
+                wrap_file(request.httprequest.environ, fileobj), headers=headers
+            )
+
+        dbname, uid, context = (
+            request.env.cr.dbname,
+            request.env.uid,
+            request.env.context,
+        )
+
+        def stream():
+            """
+            Yield the CSV chunks, read with a cursor of their own since the
+            request's cursor is closed once the response starts.
+            """
+            with Registry(dbname).cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env["hr.hospital.export"].iter_csv(kind, domain)
+
+        return request.make_response(stream(), headers=headers)
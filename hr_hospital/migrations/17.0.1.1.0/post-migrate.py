@@ -0,0 +1,6 @@
+def migrate(cr, version):
+    """
+    Drop the copy of the visit notes stored on every diagnosis: the field is
+    now read through the visit, and Odoo leaves the orphan column in place.
+    """
+    cr.execute("ALTER TABLE hr_hospital_diagnosis DROP COLUMN IF EXISTS notes")
@@ -0,0 +1,21 @@
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """
+    Recount the visit and pending diagnosis counters of all doctors and
+    patients once, instead of on every module update; pending diagnoses are
+    now only those of interns, waiting for their mentor's approval.
+
+    Also delete the doctor reports cached as attachments of the doctors,
+    readable by every user who can read the doctor: the cache now lives in
+    the private `hr.hospital.report.cache`.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env["hr.hospital.visit"]._rebuild_counters()
+    env["ir.attachment"].search(
+        [
+            ("res_model", "=", "hr.hospital.doctor"),
+            ("description", "=like", "hr_hospital.report_doctor:%"),
+        ]
+    ).unlink()
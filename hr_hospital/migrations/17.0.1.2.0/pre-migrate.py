@@ -0,0 +1,18 @@
+def migrate(cr, version):
+    """
+    Add the archiving flag of visits and diagnoses with every row active.
+
+    A column added with a constant default is filled without rewriting the
+    table, whereas Odoo would update every visit and compute the flag of
+    every diagnosis one by one.
+    """
+    cr.execute(
+        "ALTER TABLE hr_hospital_visit ADD COLUMN IF NOT EXISTS active boolean "
+        "DEFAULT TRUE"
+    )
+    cr.execute("ALTER TABLE hr_hospital_visit ALTER COLUMN active DROP DEFAULT")
+    cr.execute(
+        "ALTER TABLE hr_hospital_diagnosis ADD COLUMN IF NOT EXISTS active boolean "
+        "DEFAULT TRUE"
+    )
+    cr.execute("ALTER TABLE hr_hospital_diagnosis ALTER COLUMN active DROP DEFAULT")
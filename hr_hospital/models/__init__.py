@@ -1 +1,13 @@
-from . import diagnosis, disease, doctor, patient, person, specialty, visit
+from . import (
+    availability,
+    diagnosis,
+    disease,
+    doctor,
+    import_job,
+    patient,
+    patient_duplicate,
+    person,
+    profiling,
+    specialty,
+    visit,
+)
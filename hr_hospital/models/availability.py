@@ -0,0 +1,248 @@
+import bisect
+from datetime import datetime, time, timedelta
+
+import pytz
+from odoo import api, fields, models
+from odoo.tools.lru import LRU
+
+from .profiling import profiled
+
+# {(dbname, doctor_id): (fingerprint, {(day, slot_minutes, day_start, day_end,
+# tz): slots})}
+_slot_cache = LRU(4096)
+# Key of the doctors whose visits changed in the transaction, in the data of
+# the cursor's post-commit callbacks (cleared on commit and rollback)
+_DIRTY_KEY = "hr_hospital.availability.dirty_doctor_ids"
+
+
+class DoctorAvailability(models.AbstractModel):
+    """
+    Slot-finding engine computing the free visit slots of doctors.
+
+    Working days are split into fixed-length slots between `day_start` and
+    `day_end` (in the user's timezone). A slot is busy when a non-cancelled
+    visit of the doctor is planned within it. Planned visits of all requested
+    doctors are loaded with one range query and kept, per doctor, in a sorted
+    list searched by bisection.
+
+    Free slots are cached per doctor and day in the worker memory, together
+    with a fingerprint of the doctor's visits (their count and latest write
+    date). The fingerprints of the requested doctors are read with one cheap
+    query before the cache is used, so visits created, moved, cancelled or
+    deleted by any worker invalidate it. The cache only holds committed state:
+    doctors whose visits changed in the current transaction are computed from
+    the database and not cached, so a rollback cannot leave phantom slots.
+    """
+
+    _name = "hr.hospital.availability"
+    _description = "Doctor Availability"
+
+    @api.model
+    def _invalidate_doctors(self, doctor_ids):
+        """
+        Mark the doctors whose visits changed in the current transaction:
+        until it ends, their slots bypass the cache.
+        """
+        self.env.cr.postcommit.data.setdefault(_DIRTY_KEY, set()).update(doctor_ids)
+
+    @api.model
+    def _get_fingerprints(self, doctor_ids):
+        """
+        Return the fingerprint of the visits of each doctor, with one query.
+
+        Returns:
+            dict: (count, latest write date) tuples keyed by doctor id.
+        """
+        fingerprints = {doctor_id: (0, None) for doctor_id in doctor_ids}
+        if not doctor_ids:
+            return fingerprints
+        self.env["hr.hospital.visit"].flush_model(["doctor_id", "write_date"])
+        self.env.cr.execute(
+            """
+            SELECT doctor_id, count(*), max(write_date)
+              FROM hr_hospital_visit
+             WHERE doctor_id IN %s
+             GROUP BY doctor_id
+            """,
+            [tuple(doctor_ids)],
+        )
+        for doctor_id, count, write_date in self.env.cr.fetchall():
+            fingerprints[doctor_id] = (count, write_date)
+        return fingerprints
+
+    @api.model
+    def _get_doctors(self, doctor_ids=None, specialty_id=None):
+        """
+        Return the doctors whose availability is requested.
+        """
+        domain = []
+        if doctor_ids:
+            domain += [("id", "in", doctor_ids)]
+        if specialty_id:
+            domain += [("specialty_id", "=", specialty_id)]
+        return self.env["hr.hospital.doctor"].search(domain)
+
+    @api.model
+    def _load_busy_slots(self, doctor_ids, start, stop):
+        """
+        Load the planned visit times of doctors within [start, stop).
+
+        Returns:
+            dict: Sorted lists of planned datetimes, keyed by doctor id.
+        """
+        busy = {doctor_id: [] for doctor_id in doctor_ids}
+        self.env["hr.hospital.visit"].flush_model(
+            ["doctor_id", "planned_datetime", "status"]
+        )
+        self.env.cr.execute(
+            """
+            SELECT doctor_id, planned_datetime
+              FROM hr_hospital_visit
+             WHERE doctor_id IN %s
+               AND planned_datetime >= %s
+               AND planned_datetime < %s
+               AND status IS DISTINCT FROM 'cancelled'
+             ORDER BY doctor_id, planned_datetime
+            """,
+            [tuple(doctor_ids), start, stop],
+        )
+        for doctor_id, planned in self.env.cr.fetchall():
+            busy[doctor_id].append(planned)
+        return busy
+
+    @api.model
+    def _get_day_slots(self, day, slot_minutes, day_start, day_end, tz):
+        """
+        Return the UTC start times of all slots of a working day.
+        """
+        local_tz = pytz.timezone(tz)
+        current = local_tz.localize(datetime.combine(day, time(day_start)))
+        end = local_tz.localize(datetime.combine(day, time(day_end)))
+        slots = []
+        while current + timedelta(minutes=slot_minutes) <= end:
+            slots.append(current.astimezone(pytz.utc).replace(tzinfo=None))
+            current += timedelta(minutes=slot_minutes)
+        return slots
+
+    @api.model
+    @profiled
+    def get_free_slots(
+        self,
+        date_from,
+        date_to,
+        doctor_ids=None,
+        specialty_id=None,
+        slot_minutes=30,
+        day_start=8,
+        day_end=17,
+    ):
+        """
+        Return the free slots of doctors between two days (both included).
+
+        Args:
+            date_from (date|str): First day of the search.
+            date_to (date|str): Last day of the search.
+            doctor_ids (list): Restrict to these doctors.
+            specialty_id (int): Restrict to doctors of this specialty.
+                Without doctors nor specialty, all doctors are considered.
+            slot_minutes (int): Length of a slot.
+            day_start (int): Hour at which working days start.
+            day_end (int): Hour at which working days end.
+
+        Returns:
+            dict: Sorted lists of free slot start times (naive UTC datetimes),
+            keyed by doctor id. Slots in the past are never returned.
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        tz = self.env.user.tz or "UTC"
+        doctors = self._get_doctors(doctor_ids, specialty_id)
+        days = [
+            date_from + timedelta(days=offset)
+            for offset in range((date_to - date_from).days + 1)
+        ]
+        params = (slot_minutes, day_start, day_end, tz)
+        dbname = self.env.cr.dbname
+        dirty = self.env.cr.postcommit.data.get(_DIRTY_KEY, ())
+        fingerprints = self._get_fingerprints(doctors.ids)
+
+        # Cached slots of each doctor still matching the fingerprint; the
+        # doctors changed in this transaction start empty and are not stored
+        slot_maps = {}
+        for doctor in doctors:
+            fingerprint, cached = _slot_cache.get((dbname, doctor.id)) or (None, {})
+            if doctor.id in dirty or fingerprint != fingerprints[doctor.id]:
+                cached = {}
+            slot_maps[doctor.id] = dict(cached)
+
+        missing = [
+            doctor.id
+            for doctor in doctors
+            if any((day, *params) not in slot_maps[doctor.id] for day in days)
+        ]
+
+        if missing and days:
+            day_slots = {day: self._get_day_slots(day, *params) for day in days}
+            start = min(
+                (slots[0] for slots in day_slots.values() if slots), default=None
+            )
+            stop = max(
+                (slots[-1] for slots in day_slots.values() if slots), default=None
+            )
+            busy = (
+                self._load_busy_slots(
+                    missing, start, stop + timedelta(minutes=slot_minutes)
+                )
+                if start
+                else {doctor_id: [] for doctor_id in missing}
+            )
+            for doctor_id in missing:
+                planned = busy[doctor_id]
+                cached = slot_maps[doctor_id]
+                for day, slots in day_slots.items():
+                    cached[(day, *params)] = tuple(
+                        slot
+                        for slot in slots
+                        if not self._is_busy(planned, slot, slot_minutes)
+                    )
+                if doctor_id not in dirty:
+                    _slot_cache[(dbname, doctor_id)] = (
+                        fingerprints[doctor_id],
+                        cached,
+                    )
+
+        now = fields.Datetime.now()
+        result = {}
+        for doctor in doctors:
+            cached = slot_maps[doctor.id]
+            result[doctor.id] = [
+                slot
+                for day in days
+                for slot in cached.get((day, *params), ())
+                if slot >= now
+            ]
+        return result
+
+    @api.model
+    def _is_busy(self, planned, slot, slot_minutes):
+        """
+        Return whether a visit of the sorted `planned` list falls within the slot.
+        """
+        index = bisect.bisect_left(planned, slot)
+        return index < len(planned) and planned[index] < slot + timedelta(
+            minutes=slot_minutes
+        )
+
+    @api.model
+    def get_next_free_slot(self, doctor_id, days=14, **kwargs):
+        """
+        Return the first free slot of a doctor within the next `days` days.
+
+        Returns:
+            datetime: The slot start time (naive UTC), or False if none is free.
+        """
+        today = fields.Date.context_today(self)
+        slots = self.get_free_slots(
+            today, today + timedelta(days=days), doctor_ids=[doctor_id], **kwargs
+        )
+        return next(iter(slots.get(doctor_id, [])), False)
@@ -1,6 +1,8 @@
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
 
+from .profiling import profiled
+
 
 class Diagnosis(models.Model):
     """
@@ -11,50 +13,276 @@ class Diagnosis(models.Model):
     approval if the doctor is an intern.
 
     Fields like doctor, patient, and visit date are inherited from the related visit for consistency.
+    Diagnoses are archived and restored with their visit.
     """
 
     _name = "hr.hospital.diagnosis"
     _description = "Diagnosis"
 
-    visit_id = fields.Many2one("hr.hospital.visit", string="Visit", required=True)
-    disease_id = fields.Many2one("hr.hospital.disease", string="Disease", required=True)
+    visit_id = fields.Many2one(
+        "hr.hospital.visit", string="Visit", required=True, index=True
+    )
+    disease_id = fields.Many2one(
+        "hr.hospital.disease", string="Disease", required=True, index=True
+    )
+    disease_category_id = fields.Many2one(
+        "hr.hospital.disease",
+        string="Disease Category",
+        compute="_compute_disease_category",
+        store=True,
+        index=True,
+    )
     description = fields.Text(string="Treatment Notes")
     approved = fields.Boolean(string="Approved by Mentor")
     patient_id_related = fields.Many2one(
         "hr.hospital.patient",
         string="Patient (Related)",
-        compute="_compute_patient",
+        compute="_compute_visit_fields",
         store=True,
+        index=True,
     )
     doctor_id = fields.Many2one(
         "hr.hospital.doctor",
         string="Doctor",
-        related="visit_id.doctor_id",
+        compute="_compute_visit_fields",
         store=True,
-        readonly=True,
     )
     diagnosis_date = fields.Datetime(
         string="Diagnosis Date",
-        related="visit_id.actual_datetime",
+        compute="_compute_visit_fields",
         store=True,
-        readonly=True,
-    )
-    notes = fields.Text(
-        string="Visit Notes", related="visit_id.notes", store=True, readonly=True
+        index=True,
     )
+    notes = fields.Text(string="Visit Notes", related="visit_id.notes")
+    active = fields.Boolean(compute="_compute_visit_fields", store=True)
 
-    @api.depends("visit_id.patient_id")
-    def _compute_patient(self):
+    _analysis_fields = {"visit_id", "disease_id", "approved"}
+    _counter_fields = {"visit_id", "approved"}
+
+    def init(self):
+        """
+        Create the partial indexes of the hot access patterns:
+
+        - the diagnosis date of active diagnoses, for the lists and reports
+          that leave the archive out,
+        - the doctor of diagnoses waiting for approval, for the mentor
+          approval queue; it only holds the pending diagnoses.
+        """
+        tools.create_index(
+            self.env.cr,
+            "hr_hospital_diagnosis_date_active_idx",
+            self._table,
+            ["diagnosis_date"],
+            where="active",
+        )
+        tools.create_index(
+            self.env.cr,
+            "hr_hospital_diagnosis_doctor_pending_idx",
+            self._table,
+            ["doctor_id"],
+            where="approved IS NOT TRUE AND active",
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        Queue the days of new diagnoses for the diagnosis analysis, and count
+        the pending ones on their doctors and patients.
         """
-        Compute the related patient based on the selected visit.
+        records = super().create(vals_list)
+        self.env["hr.hospital.diagnosis.analysis"]._queue_diagnoses(records.ids)
+        records._update_pending_counters(1)
+        return records
 
-        This method ensures that the 'patient_id_related' field reflects the patient assigned
-        to the corresponding hospital visit, maintaining data consistency across models.
+    def write(self, vals):
+        """
+        Queue the days touched by the change, before and after it, for the
+        diagnosis analysis, and update the pending diagnosis counters.
+        """
+        analysis = self.env["hr.hospital.diagnosis.analysis"]
+        counters = self._counter_fields.intersection(vals)
+        if self._analysis_fields.intersection(vals):
+            analysis._queue_diagnoses(self.ids)
+        if counters:
+            self._update_pending_counters(-1)
+        res = super().write(vals)
+        if self._analysis_fields.intersection(vals):
+            analysis._queue_diagnoses(self.ids)
+        if counters:
+            self._update_pending_counters(1)
+        return res
+
+    def unlink(self):
+        """
+        Queue the days of removed diagnoses for the diagnosis analysis, and
+        remove the pending ones from the counters.
+        """
+        self.env["hr.hospital.diagnosis.analysis"]._queue_diagnoses(self.ids)
+        self._update_pending_counters(-1)
+        return super().unlink()
+
+    def _update_pending_counters(self, sign):
+        """
+        Add (sign=1) or remove (sign=-1) the diagnoses waiting for approval
+        from the pending diagnosis counters of their visits' doctors and
+        patients, with a single statement.
+
+        A diagnosis waits for approval when it is not approved, its visit is
+        active and its doctor is an intern: the diagnoses listed in the
+        mentors' approval queue.
+        """
+        if not self.ids:
+            return
+        self.flush_recordset(list(self._counter_fields))
+        self.env["hr.hospital.visit"].flush_model(["doctor_id", "patient_id", "active"])
+        self.env["hr.hospital.doctor"].flush_model(["is_intern"])
+        self.env.cr.execute(
+            """
+            WITH pending AS (
+                SELECT v.doctor_id, v.patient_id
+                  FROM hr_hospital_diagnosis g
+                  JOIN hr_hospital_visit v ON v.id = g.visit_id AND v.active
+                  JOIN hr_hospital_doctor d ON d.id = v.doctor_id AND d.is_intern
+                 WHERE g.id IN %(ids)s AND g.approved IS NOT TRUE
+            ), doctors AS (
+                UPDATE hr_hospital_doctor d
+                   SET pending_diagnosis_count = coalesce(d.pending_diagnosis_count, 0)
+                                                 + %(sign)s * delta.count
+                  FROM (SELECT doctor_id, count(*) AS count
+                          FROM pending
+                         GROUP BY doctor_id) delta
+                 WHERE d.id = delta.doctor_id
+            )
+            UPDATE hr_hospital_patient p
+               SET pending_diagnosis_count = coalesce(p.pending_diagnosis_count, 0)
+                                             + %(sign)s * delta.count
+              FROM (SELECT patient_id, count(*) AS count
+                      FROM pending
+                     GROUP BY patient_id) delta
+             WHERE p.id = delta.patient_id
+            """,
+            {"ids": tuple(self.ids), "sign": sign},
+        )
+        self.env["hr.hospital.doctor"].invalidate_model(["pending_diagnosis_count"])
+        self.env["hr.hospital.patient"].invalidate_model(["pending_diagnosis_count"])
+
+    @api.depends("visit_id")
+    def _compute_visit_fields(self):
+        """
+        Copy the patient, doctor, actual time and archiving of the visit on
+        the diagnosis.
+
+        Only a change of visit triggers this compute. Changes made on the visit
+        itself are applied to all its diagnoses at once by `_sync_visit_fields`,
+        instead of recomputing the diagnoses one by one.
         """
         for rec in self:
             rec.patient_id_related = rec.visit_id.patient_id
+            rec.doctor_id = rec.visit_id.doctor_id
+            rec.diagnosis_date = rec.visit_id.actual_datetime
+            rec.active = rec.visit_id.active if rec.visit_id else True
+
+    @api.model
+    @profiled
+    def _sync_visit_fields(self, visit_ids):
+        """
+        Copy the patient, doctor, actual time and archiving of the given
+        visits on all their diagnoses, with a single UPDATE.
+        """
+        if not visit_ids:
+            return
+        self.env["hr.hospital.visit"].flush_model(
+            ["patient_id", "doctor_id", "actual_datetime", "active"]
+        )
+        self.flush_model(["visit_id"])
+        self.env.cr.execute(
+            """
+            UPDATE hr_hospital_diagnosis g
+               SET patient_id_related = v.patient_id,
+                   doctor_id = v.doctor_id,
+                   diagnosis_date = v.actual_datetime,
+                   active = v.active
+              FROM hr_hospital_visit v
+             WHERE v.id = g.visit_id
+               AND v.id IN %s
+               AND (g.patient_id_related IS DISTINCT FROM v.patient_id
+                    OR g.doctor_id IS DISTINCT FROM v.doctor_id
+                    OR g.diagnosis_date IS DISTINCT FROM v.actual_datetime
+                    OR g.active IS DISTINCT FROM v.active)
+            RETURNING g.id
+            """,
+            [tuple(visit_ids)],
+        )
+        diagnoses = self.browse([row[0] for row in self.env.cr.fetchall()])
+        fnames = ["patient_id_related", "doctor_id", "diagnosis_date", "active"]
+        self.invalidate_model(fnames)
+        diagnoses.modified(fnames)
+
+    @api.model
+    def _get_approval_queue_domain(self):
+        """
+        Return the domain of the diagnoses of the current user's interns that
+        wait for approval, as counted in `pending_diagnosis_count`; archived
+        diagnoses are left out by the active test.
+        """
+        return [
+            ("doctor_id.mentor_id.user_id", "=", self.env.uid),
+            ("doctor_id.is_intern", "=", True),
+            ("approved", "=", False),
+        ]
+
+    @api.model
+    def action_open_approval_queue(self):
+        """
+        Open the diagnoses of the current user's interns waiting for approval.
+
+        Returns:
+            dict: An ir.actions.act_window listing the queue.
+        """
+        return {
+            "name": _("Diagnoses to Approve"),
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "view_mode": "tree,form",
+            "views": [
+                (self.env.ref("hr_hospital.view_diagnosis_tree_approval").id, "tree"),
+                (False, "form"),
+            ],
+            "domain": self._get_approval_queue_domain(),
+        }
+
+    @profiled
+    def action_approve(self):
+        """
+        Approve the diagnoses; those still pending are written with a single
+        UPDATE.
+
+        Only the diagnoses of the caller's approval queue are approved, so
+        interns cannot approve their own diagnoses nor doctors those of
+        interns they do not mentor; hospital admins approve any diagnosis.
+        """
+        diagnoses = self
+        if not (self.env.su or self.env.user.has_group("hr_hospital.group_admin")):
+            queue = self.sudo().filtered_domain(self._get_approval_queue_domain())
+            diagnoses = self.browse(queue.ids)
+        diagnoses.filtered(lambda rec: not rec.approved).write({"approved": True})
+
+    @api.depends("disease_id.parent_path")
+    def _compute_disease_category(self):
+        """
+        Compute the top-level disease of the diagnosed disease.
+
+        Storing the category lets the pivot roll diagnoses up by disease
+        category without walking the disease tree.
+        """
+        disease_model = self.env["hr.hospital.disease"]
+        for rec in self:
+            rec.disease_category_id = disease_model._get_root_id(
+                rec.disease_id.parent_path
+            )
 
     @api.constrains("approved")
+    @profiled
     def _check_approval_rights(self):
         """
         Ensure mentor approval is provided for diagnoses created by interns.
@@ -62,9 +290,26 @@ class Diagnosis(models.Model):
         Business rule: If the doctor who created the diagnosis is marked as an intern,
         the 'approved' checkbox must be enabled by their mentor. Otherwise, a ValidationError is raised
         to prevent saving the record.
+
+        The whole recordset is validated with a single query.
         """
-        for rec in self:
-            if rec.visit_id.doctor_id.is_intern and not rec.approved:
-                raise ValidationError(
-                    _("Diagnosis by intern must be approved by mentor.")
-                )
+        if not self.ids:
+            return
+        self.flush_recordset(["visit_id", "approved"])
+        self.env["hr.hospital.visit"].flush_model(["doctor_id"])
+        self.env["hr.hospital.doctor"].flush_model(["is_intern"])
+        self.env.cr.execute(
+            """
+            SELECT 1
+              FROM hr_hospital_diagnosis g
+              JOIN hr_hospital_visit v ON v.id = g.visit_id
+              JOIN hr_hospital_doctor d ON d.id = v.doctor_id
+             WHERE g.id IN %s
+               AND g.approved IS NOT TRUE
+               AND d.is_intern
+             LIMIT 1
+            """,
+            [tuple(self.ids)],
+        )
+        if self.env.cr.fetchone():
+            raise ValidationError(_("Diagnosis by intern must be approved by mentor."))
@@ -1,4 +1,6 @@
-from odoo import fields, models
+from odoo import api, fields, models
+
+from .profiling import profiled
 
 
 class HospitalDisease(models.Model):
@@ -8,11 +10,15 @@ class HospitalDisease(models.Model):
     Diseases can be organized in a hierarchical structure using parent-child relationships,
     allowing grouping of similar or related conditions (e.g. 'Infections' → 'Viral Infection' → 'Flu').
 
+    The hierarchy is stored as a materialized path (`parent_path`), so subtree
+    lookups such as `child_of` domains are resolved with index scans.
+
     This model is intended to be used when assigning diagnoses to patient visits.
     """
 
     _name = "hr.hospital.disease"
     _description = "Disease"
+    _parent_store = True
 
     name = fields.Char(string="Disease Name", required=True)
     parent_id = fields.Many2one(
@@ -21,3 +27,59 @@ class HospitalDisease(models.Model):
     child_ids = fields.One2many(
         "hr.hospital.disease", "parent_id", string="Sub Diseases"
     )
+    parent_path = fields.Char(index=True, unaccent=False)
+    diagnosis_count = fields.Integer(
+        string="Diagnoses", compute="_compute_diagnosis_count"
+    )
+
+    @profiled
+    def _compute_diagnosis_count(self):
+        """
+        Compute the number of diagnoses of each disease and all its sub diseases.
+
+        Counts for the whole recordset are computed by a single query that
+        matches diagnoses on the materialized path of their disease.
+        """
+        counts = {}
+        if self.ids:
+            self.flush_model(["parent_path"])
+            self.env["hr.hospital.diagnosis"].flush_model(["disease_id"])
+            self.env.cr.execute(
+                """
+                SELECT disease.id, COUNT(diagnosis.id)
+                  FROM hr_hospital_disease disease
+                  JOIN hr_hospital_disease sub
+                    ON sub.parent_path LIKE disease.parent_path || '%%'
+                  JOIN hr_hospital_diagnosis diagnosis
+                    ON diagnosis.disease_id = sub.id
+                 WHERE disease.id IN %s
+                 GROUP BY disease.id
+                """,
+                [tuple(self.ids)],
+            )
+            counts = dict(self.env.cr.fetchall())
+        for rec in self:
+            rec.diagnosis_count = counts.get(rec.id, 0)
+
+    def write(self, vals):
+        """
+        Queue the days of the diagnoses of a subtree moved under another
+        parent for the diagnosis analysis.
+        """
+        res = super().write(vals)
+        if "parent_id" in vals:
+            subtree = self.search([("id", "child_of", self.ids)])
+            diagnoses = (
+                self.env["hr.hospital.diagnosis"]
+                .with_context(active_test=False)
+                .search([("disease_id", "in", subtree.ids)])
+            )
+            self.env["hr.hospital.diagnosis.analysis"]._queue_diagnoses(diagnoses.ids)
+        return res
+
+    @api.model
+    def _get_root_id(self, parent_path):
+        """
+        Return the id of the top-level disease of a materialized path.
+        """
+        return int(parent_path.split("/")[0]) if parent_path else False
@@ -1,4 +1,3 @@
-from lxml import etree
 from odoo import api, fields, models
 
 
@@ -22,7 +21,10 @@ class Doctor(models.Model):
     specialty_id = fields.Many2one("hr.hospital.specialty", string="Specialty")
     is_intern = fields.Boolean(string="Intern")
     mentor_id = fields.Many2one(
-        "hr.hospital.doctor", string="Mentor", domain="[('is_intern','=',False)]"
+        "hr.hospital.doctor",
+        string="Mentor",
+        domain="[('is_intern','=',False)]",
+        index=True,
     )
     intern_ids = fields.One2many("hr.hospital.doctor", "mentor_id", string="Interns")
     visit_ids = fields.One2many("hr.hospital.visit", "doctor_id", string="Visits")
@@ -30,6 +32,34 @@ class Doctor(models.Model):
         string="Interns' names", compute="_compute_interns_names", store=True
     )
 
+    # Counters maintained in SQL by visits and diagnoses, see
+    # hr.hospital.visit._update_counters
+    visit_planned_count = fields.Integer(
+        string="Planned Visits", readonly=True, copy=False, default=0
+    )
+    visit_done_count = fields.Integer(
+        string="Done Visits", readonly=True, copy=False, default=0
+    )
+    visit_cancelled_count = fields.Integer(
+        string="Cancelled Visits", readonly=True, copy=False, default=0
+    )
+    patient_count = fields.Integer(
+        string="Patients Seen",
+        readonly=True,
+        copy=False,
+        default=0,
+        help="Number of distinct patients with a visit to this doctor.",
+    )
+    last_visit_date = fields.Date(string="Last Visit", readonly=True, copy=False)
+    pending_diagnosis_count = fields.Integer(
+        string="Diagnoses to Approve",
+        readonly=True,
+        copy=False,
+        default=0,
+        help="Diagnoses of this intern's active visits waiting for the "
+        "mentor's approval.",
+    )
+
     @api.depends("first_name", "last_name")
     def _compute_name(self):
         """
@@ -46,19 +76,73 @@ class Doctor(models.Model):
         for rec in self:
             rec.interns_names = ", ".join(rec.intern_ids.mapped("name") or [])
 
-    def fields_view_get(
-        self, view_id=None, view_type="form", toolbar=False, submenu=False
-    ):
+    def write(self, vals):
+        """
+        Queue the diagnosis days of doctors whose specialty or intern flag
+        changes, so the diagnosis analysis is regrouped accordingly, and move
+        the diagnoses of doctors whose intern flag changes in or out of the
+        pending diagnosis counters.
+        """
+        if "is_intern" in vals:
+            diagnoses = (
+                self.env["hr.hospital.diagnosis"]
+                .sudo()
+                .with_context(active_test=False)
+                .search([("doctor_id", "in", self.ids)])
+            )
+            diagnoses._update_pending_counters(-1)
+        res = super().write(vals)
+        if "is_intern" in vals:
+            diagnoses._update_pending_counters(1)
+        if "specialty_id" in vals or "is_intern" in vals:
+            self.env["hr.hospital.diagnosis.analysis"]._queue_doctors(self.ids)
+        return res
+
+    def action_record_patient(self):
         """
-        Customize the form view to conditionally hide the mentor field
-        when the doctor is not marked as an intern.
+        Open the quick visit form for this doctor, pre-filled with the
+        doctor's next free slot.
 
-        This enhances usability by hiding irrelevant fields.
+        Returns:
+            dict: An ir.actions.act_window opening the new visit form.
         """
-        res = super().fields_view_get(view_id, view_type, toolbar, submenu)
+        self.ensure_one()
+        action = self.env["ir.actions.act_window"]._for_xml_id(
+            "hr_hospital.action_visit_quick_create"
+        )
+        action["context"] = {
+            "default_doctor_id": self.id,
+            "default_planned_datetime": self.env[
+                "hr.hospital.availability"
+            ].get_next_free_slot(self.id),
+        }
+        return action
+
+    def action_print_report_background(self):
+        """
+        Queue the rendering of the doctors' reports instead of rendering them
+        in the request.
+
+        Returns:
+            dict: An action downloading the reports at once when they are all
+            cached, or opening the queued job.
+        """
+        job = self.env["hr.hospital.report.job"].create(
+            {"doctor_ids": [(6, 0, self.ids)]}
+        )
+        return job.action_start()
+
+    @api.model
+    def _get_view(self, view_id=None, view_type="form", **options):
+        """
+        Hide the mentor field of form views when the doctor is not an intern.
+
+        The arch returned here is post-processed and cached by `get_view` per
+        view, language and user groups, so this runs once per cache key
+        rather than on every form load.
+        """
+        arch, view = super()._get_view(view_id, view_type, **options)
         if view_type == "form":
-            doc = etree.XML(res["arch"])
-            for field in doc.xpath("//field[@name='mentor_id']"):
-                field.set("attrs", '{"invisible": [["is_intern", "=", False]]}')
-            res["arch"] = etree.tostring(doc, encoding="unicode")
-        return res
+            for node in arch.xpath("//field[@name='mentor_id']"):
+                node.set("invisible", "not is_intern")
+        return arch, view
@@ -0,0 +1,391 @@
+import base64
+import csv
+import io
+import itertools
+import json
+import logging
+import time
+
+from odoo import _, api, fields, models
+from odoo.modules import module as odoo_module
+from odoo.tools import str2bool
+
+from .profiling import profiled
+
+_logger = logging.getLogger(__name__)
+
+
+class HospitalImportJob(models.Model):
+    """
+    A queued import of patients, visits or diagnoses from a CSV or JSON Lines
+    file.
+
+    The file is kept as an attachment of the job and streamed from the
+    filestore, so it is never decoded in memory as a whole. The "Import Data"
+    scheduled action reads the rows lazily and creates them in chunks with a
+    single `create()` call, so stored computes and constraints
+    (duplicate visits, approval rights) run once per chunk on the whole batch.
+    Each chunk runs in a savepoint: when the batch is rejected, its rows are
+    retried one by one to isolate the failing ones, which are listed in a
+    downloadable error report.
+
+    The number of processed rows is checkpointed on the job after every chunk,
+    committed with it outside of tests, so an interrupted run resumes where it
+    stopped.
+    """
+
+    _name = "hr.hospital.import.job"
+    _description = "Hospital Data Import"
+    _order = "id desc"
+
+    # Seconds of importing per run of the scheduled action, which triggers
+    # itself again when jobs are left
+    _time_budget = 300
+    # Columns accepted for each target, in the order of the error report
+    _import_fields = {
+        "hr.hospital.patient": [
+            "first_name",
+            "last_name",
+            "gender",
+            "phone",
+            "birth_date",
+            "passport_data",
+            "contact_person",
+            "personal_doctor_id",
+        ],
+        "hr.hospital.visit": [
+            "doctor_id",
+            "patient_id",
+            "planned_datetime",
+            "actual_datetime",
+            "status",
+            "notes",
+        ],
+        "hr.hospital.diagnosis": [
+            "visit_id",
+            "disease_id",
+            "description",
+            "approved",
+        ],
+    }
+
+    name = fields.Char(required=True, readonly=True)
+    user_id = fields.Many2one(
+        "res.users",
+        string="Requested By",
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.user,
+    )
+    res_model = fields.Selection(
+        [
+            ("hr.hospital.patient", "Patients"),
+            ("hr.hospital.visit", "Visits"),
+            ("hr.hospital.diagnosis", "Diagnoses"),
+        ],
+        string="Import",
+        required=True,
+        readonly=True,
+    )
+    file_format = fields.Selection(
+        [("csv", "CSV"), ("jsonl", "JSON Lines")], required=True, readonly=True
+    )
+    attachment_id = fields.Many2one(
+        "ir.attachment", string="File", required=True, readonly=True
+    )
+    chunk_size = fields.Integer(default=1000, required=True, readonly=True)
+    state = fields.Selection(
+        [("queued", "Queued"), ("done", "Done"), ("failed", "Failed")],
+        default="queued",
+        required=True,
+        readonly=True,
+    )
+    processed_rows = fields.Integer(
+        readonly=True, help="Rows already imported or rejected, skipped on resume."
+    )
+    imported_rows = fields.Integer(readonly=True)
+    error_rows = fields.Integer(readonly=True)
+    error_report_id = fields.Many2one("ir.attachment", readonly=True)
+    error = fields.Text(readonly=True)
+
+    def _open_file(self):
+        """
+        Return a binary stream of the imported file, read from the filestore
+        when the attachment is stored there.
+        """
+        attachment = self.attachment_id.sudo()
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), "rb")
+        return io.BytesIO(attachment.raw)
+
+    def _read_rows(self):
+        """
+        Lazily yield the rows of the file as dicts of strings or JSON values.
+        """
+        with self._open_file() as data:
+            stream = io.TextIOWrapper(data, encoding="utf-8-sig", newline="")
+            if self.file_format == "jsonl":
+                for line in stream:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from csv.DictReader(stream)
+
+    def _convert_value(self, field, value):
+        """
+        Convert a raw file value to the value expected by `create()`.
+
+        Many2one values are returned as is and resolved per chunk by
+        `_resolve_references`.
+
+        Raises:
+            ValueError: if the value cannot be converted.
+        """
+        if value in (None, "") or field.type == "many2one":
+            return value if value not in (None, "") else False
+        if field.type == "boolean":
+            return value if isinstance(value, bool) else str2bool(value)
+        if field.type == "integer":
+            return int(value)
+        if field.type == "date":
+            return fields.Date.to_date(value)
+        if field.type == "datetime":
+            return fields.Datetime.to_datetime(value)
+        if field.type == "selection":
+            values = [key for key, _label in field._description_selection(self.env)]
+            if value not in values:
+                raise ValueError(
+                    _(
+                        "Invalid value %(value)r for %(field)s",
+                        value=value,
+                        field=field.name,
+                    )
+                )
+        return value
+
+    def _resolve_references(self, vals_list, errors):
+        """
+        Replace the many2one values of a chunk by record ids.
+
+        A value is either a database id or the exact name of the record;
+        every referenced model is looked up once for the whole chunk. Rows
+        with an unknown or ambiguous reference are added to `errors`.
+
+        Args:
+            vals_list (list): (row number, vals) pairs, updated in place.
+            errors (list): (row number, message) pairs of rejected rows.
+
+        Returns:
+            list: The (row number, vals) pairs whose references all resolved.
+        """
+        model = self.env[self.res_model]
+        for name in self._import_fields[self.res_model]:
+            field = model._fields[name]
+            if field.type != "many2one":
+                continue
+            comodel = self.env[field.comodel_name]
+            values = {vals[name] for _row, vals in vals_list if vals.get(name)}
+            ids = {
+                int(value)
+                for value in values
+                if isinstance(value, int) or str(value).isdigit()
+            }
+            existing = set(comodel.browse(ids).exists().ids)
+            names = {
+                value
+                for value in values
+                if not (isinstance(value, int) or str(value).isdigit())
+            }
+            by_name = {}
+            if names and comodel._rec_name:
+                for record in comodel.search([(comodel._rec_name, "in", list(names))]):
+                    by_name.setdefault(record[comodel._rec_name], []).append(record.id)
+            resolved = []
+            for row, vals in vals_list:
+                value = vals.get(name)
+                if not value:
+                    resolved.append((row, vals))
+                    continue
+                if isinstance(value, int) or str(value).isdigit():
+                    matches = [int(value)] if int(value) in existing else []
+                else:
+                    matches = by_name.get(value, [])
+                if len(matches) != 1:
+                    errors.append(
+                        (
+                            row,
+                            _(
+                                "%(field)s: %(count)s records match %(value)r",
+                                field=name,
+                                count=len(matches),
+                                value=value,
+                            ),
+                        )
+                    )
+                    continue
+                vals[name] = matches[0]
+                resolved.append((row, vals))
+            vals_list = resolved
+        return vals_list
+
+    def _prepare_chunk(self, chunk, errors):
+        """
+        Convert a chunk of file rows to `create()` values.
+
+        Returns:
+            list: (row number, vals) pairs of the rows that could be converted.
+        """
+        model = self.env[self.res_model]
+        names = self._import_fields[self.res_model]
+        vals_list = []
+        for row, data in chunk:
+            unknown = {str(key) for key in data if key not in names}
+            if unknown:
+                errors.append(
+                    (row, _("Unknown columns: %s", ", ".join(sorted(unknown))))
+                )
+                continue
+            try:
+                vals = {
+                    name: self._convert_value(model._fields[name], value)
+                    for name, value in data.items()
+                }
+            except (TypeError, ValueError) as error:
+                errors.append((row, str(error)))
+                continue
+            vals_list.append((row, vals))
+        return self._resolve_references(vals_list, errors)
+
+    def _create_chunk(self, vals_list, errors):
+        """
+        Create the records of a chunk with one `create()` call; if it fails,
+        create them one by one to isolate the rejected rows.
+
+        Returns:
+            int: The number of created records.
+        """
+        model = self.env[self.res_model].with_context(
+            # completed visits are history being loaded, not edits
+            no_check_edit=True,
+            tracking_disable=True,
+        )
+        try:
+            with self.env.cr.savepoint():
+                model.create([vals for _row, vals in vals_list])
+            return len(vals_list)
+        except Exception:  # pylint: disable=broad-except
+            _logger.info("Import chunk rejected, retrying its rows one by one")
+        created = 0
+        for row, vals in vals_list:
+            try:
+                with self.env.cr.savepoint():
+                    model.create(vals)
+                created += 1
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append((row, str(error)))
+        return created
+
+    def _write_error_report(self, errors):
+        """
+        Append the rejected rows to the error report attachment.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        if self.error_report_id:
+            output.write(base64.b64decode(self.error_report_id.datas).decode())
+        else:
+            writer.writerow(["row", "error"])
+        writer.writerows(sorted(errors))
+        datas = base64.b64encode(output.getvalue().encode())
+        if self.error_report_id:
+            self.error_report_id.datas = datas
+        else:
+            self.error_report_id = self.env["ir.attachment"].create(
+                {
+                    "name": f"{self.name}.errors.csv",
+                    "datas": datas,
+                    "mimetype": "text/csv",
+                    "res_model": self._name,
+                    "res_id": self.id,
+                }
+            )
+
+    def _import_chunk(self, chunk):
+        """
+        Import a chunk of (row number, row) pairs and checkpoint the job.
+        """
+        errors = []
+        vals_list = self._prepare_chunk(chunk, errors)
+        created = self._create_chunk(vals_list, errors) if vals_list else 0
+        if errors:
+            self._write_error_report(errors)
+        self.write(
+            {
+                "processed_rows": self.processed_rows + len(chunk),
+                "imported_rows": self.imported_rows + created,
+                "error_rows": self.error_rows + len(errors),
+            }
+        )
+
+    def _run(self, deadline):
+        """
+        Import the file chunk by chunk, resuming after the already processed
+        rows, until it is done or the deadline is passed.
+
+        A file that cannot be read (bad encoding, malformed JSON or CSV) fails
+        the job; the rows imported before are kept.
+
+        Returns:
+            bool: Whether the job is finished.
+        """
+        rows = enumerate(self._read_rows(), start=1)
+        rows = itertools.islice(rows, self.processed_rows, None)
+        while time.monotonic() < deadline:
+            try:
+                chunk = list(itertools.islice(rows, self.chunk_size))
+            except (OSError, ValueError, csv.Error) as error:
+                _logger.warning("Hospital import %s failed: %s", self.id, error)
+                self.write({"state": "failed", "error": str(error)})
+                return True
+            if not chunk:
+                self.state = "done"
+                return True
+            self._import_chunk(chunk)
+            self.env.flush_all()
+            if not odoo_module.current_test:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+            _logger.info(
+                "Hospital import %s: %s rows processed, %s imported, %s rejected",
+                self.res_model,
+                self.processed_rows,
+                self.imported_rows,
+                self.error_rows,
+            )
+        return False
+
+    @api.model
+    @profiled
+    def _cron_process(self):
+        """
+        Run the queued imports, oldest first, within the time budget of a run.
+        """
+        deadline = time.monotonic() + self._time_budget
+        for job in self.search([("state", "=", "queued")], order="id"):
+            if not job._run(deadline):
+                self.env.ref("hr_hospital.ir_cron_import_data")._trigger()
+                return
+
+    def action_download_errors(self):
+        """
+        Download the error report of the import.
+
+        Returns:
+            dict: An ir.actions.act_url downloading the report.
+        """
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/web/content/{self.error_report_id.id}?download=true",
+            "target": "self",
+        }
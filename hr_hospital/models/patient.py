@@ -1,6 +1,12 @@
-from datetime import date
+import hashlib
+import re
+import unicodedata
+from datetime import date, timedelta
 
-from odoo import api, fields, models
+from odoo import _, api, fields, models, tools
+from odoo.osv import expression
+
+from .profiling import profiled
 
 
 class Patient(models.Model):
@@ -17,36 +23,149 @@ class Patient(models.Model):
     _name = "hr.hospital.patient"
     _inherit = "hr.hospital.person"
     _description = "Patient"
+    # Quick search by partial name, phone or passport, all trigram-indexed, so
+    # name_search is a single statement answered by index scans.
+    _rec_names_search = ["name", "phone", "passport_data"]
 
-    name = fields.Char(string="Name", compute="_compute_name", store=True)
+    name = fields.Char(
+        string="Name", compute="_compute_name", store=True, index="trigram"
+    )
+    phone = fields.Char(index="trigram")
 
-    personal_doctor_id = fields.Many2one("hr.hospital.doctor", string="Personal Doctor")
+    personal_doctor_id = fields.Many2one(
+        "hr.hospital.doctor", string="Personal Doctor", index="btree_not_null"
+    )
     birth_date = fields.Date(string="Birth Date")
-    passport_data = fields.Char(string="Passport Information")
+    passport_data = fields.Char(string="Passport Information", index="trigram")
     contact_person = fields.Char(string="Emergency Contact")
 
-    age = fields.Integer(string="Age", compute="_compute_age", store=True)
+    age = fields.Integer(string="Age", compute="_compute_age", store=True, index=True)
+    passport_key = fields.Char(
+        string="Passport Key",
+        compute="_compute_duplicate_keys",
+        store=True,
+        index="btree_not_null",
+        copy=False,
+        help="Passport number without separators, in upper case.",
+    )
+    identity_key = fields.Char(
+        string="Identity Key",
+        compute="_compute_duplicate_keys",
+        store=True,
+        index="btree_not_null",
+        copy=False,
+        help="Hash of the normalized name, birth date and phone number.",
+    )
+
+    # Counters maintained in SQL by visits and diagnoses, see
+    # hr.hospital.visit._update_counters
+    visit_planned_count = fields.Integer(
+        string="Planned Visits", readonly=True, copy=False, default=0
+    )
+    visit_done_count = fields.Integer(
+        string="Done Visits", readonly=True, copy=False, default=0
+    )
+    visit_cancelled_count = fields.Integer(
+        string="Cancelled Visits", readonly=True, copy=False, default=0
+    )
+    last_visit_date = fields.Date(string="Last Visit", readonly=True, copy=False)
+    pending_diagnosis_count = fields.Integer(
+        string="Diagnoses to Approve",
+        readonly=True,
+        copy=False,
+        default=0,
+        help="Diagnoses of this patient's active visits to interns waiting "
+        "for the mentor's approval.",
+    )
     diagnosis_ids = fields.One2many(
         "hr.hospital.diagnosis",
         "patient_id_related",
         string="Diagnosis History",
-        compute="_compute_diagnosis_ids",
-        store=False,
+        readonly=True,
     )
 
-    @api.depends()
-    def _compute_diagnosis_ids(self):
+    def init(self):
+        """
+        Create the (month, day) index of birth dates used by the nightly age update.
+        """
+        tools.create_index(
+            self.env.cr,
+            "hr_hospital_patient_birthday_idx",
+            self._table,
+            ["(EXTRACT(MONTH FROM birth_date))", "(EXTRACT(DAY FROM birth_date))"],
+        )
+
+    @api.model
+    def _normalize_passport(self, passport):
+        """
+        Return the passport number without spaces, dashes or other separators,
+        in upper case, or False if it has no letter nor digit.
+        """
+        return re.sub(r"[\W_]+", "", passport or "").upper() or False
+
+    @api.model
+    def _normalize_identity(self, name, birth_date, phone):
+        """
+        Return a hash of the name (case, accents and spacing ignored), birth
+        date and last 9 digits of the phone number, or False without a name
+        or a birth date.
         """
-        Compute and assign all diagnoses related to the patient.
+        if not (name and birth_date):
+            return False
+        name = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", name.casefold())
+            if not unicodedata.combining(char)
+        )
+        phone = re.sub(r"\D", "", phone or "")[-9:]
+        key = f"{' '.join(name.split())}|{fields.Date.to_string(birth_date)}|{phone}"
+        return hashlib.sha256(key.encode()).hexdigest()
 
-        The relation is indirect: through hr.hospital.visit
-        and linked diagnosis records where patient_id is involved.
+    @api.depends("passport_data", "name", "birth_date", "phone")
+    def _compute_duplicate_keys(self):
+        """
+        Compute the normalized keys used to detect duplicate patients.
         """
-        for patient in self:
-            diagnoses = self.env["hr.hospital.diagnosis"].search(
-                [("visit_id.patient_id", "=", patient.id)]
+        for rec in self:
+            rec.passport_key = self._normalize_passport(rec.passport_data)
+            rec.identity_key = self._normalize_identity(
+                rec.name, rec.birth_date, rec.phone
             )
-            patient.diagnosis_ids = diagnoses
+
+    def _get_duplicates(self, limit=5):
+        """
+        Return the other patients sharing the passport or identity key of this
+        patient, looked up on the key indexes.
+        """
+        self.ensure_one()
+        keys = []
+        if self.passport_key:
+            keys.append([("passport_key", "=", self.passport_key)])
+        if self.identity_key:
+            keys.append([("identity_key", "=", self.identity_key)])
+        if not keys:
+            return self.browse()
+        domain = expression.OR(keys)
+        if self._origin.id:
+            domain = expression.AND([domain, [("id", "!=", self._origin.id)]])
+        return self.search(domain, limit=limit)
+
+    @api.onchange("first_name", "last_name", "birth_date", "phone", "passport_data")
+    def _onchange_duplicate_keys(self):
+        """
+        Warn when the patient being edited looks like an existing patient.
+        """
+        duplicates = self._get_duplicates()
+        if duplicates:
+            return {
+                "warning": {
+                    "title": _("Possible duplicate"),
+                    "message": _(
+                        "This patient may already exist: %s",
+                        ", ".join(duplicates.mapped("display_name")),
+                    ),
+                }
+            }
 
     @api.depends("birth_date")
     def _compute_age(self):
@@ -69,6 +188,50 @@ class Patient(models.Model):
             else:
                 rec.age = 0
 
+    @api.model
+    @profiled
+    def _cron_update_age(self):
+        """
+        Refresh the stored age of patients whose birthday occurred since the last run.
+
+        Only the (month, day) pairs between the previous run and today are
+        updated, with a single UPDATE using the birthday index. Patients born
+        on February 29 are updated on March 1 in non-leap years, matching
+        `_compute_age`. The first run refreshes every patient.
+        """
+        params = self.env["ir.config_parameter"].sudo()
+        today = fields.Date.context_today(self)
+        last_run = fields.Date.to_date(params.get_param("hr_hospital.age_last_run"))
+        if not last_run:
+            last_run = today - timedelta(days=366)
+        day = max(last_run + timedelta(days=1), today - timedelta(days=365))
+        birthdays = set()
+        while day <= today:
+            birthdays.add((day.month, day.day))
+            if (day.month, day.day) == (3, 1):
+                birthdays.add((2, 29))
+            day += timedelta(days=1)
+        if not birthdays:
+            return
+        self.flush_model(["birth_date"])
+        self.env.cr.execute(
+            """
+            UPDATE hr_hospital_patient
+               SET age = EXTRACT(YEAR FROM %(today)s::date)
+                         - EXTRACT(YEAR FROM birth_date)
+                         - CASE WHEN (EXTRACT(MONTH FROM %(today)s::date),
+                                      EXTRACT(DAY FROM %(today)s::date))
+                                   < (EXTRACT(MONTH FROM birth_date),
+                                      EXTRACT(DAY FROM birth_date))
+                                THEN 1 ELSE 0 END
+             WHERE (EXTRACT(MONTH FROM birth_date), EXTRACT(DAY FROM birth_date))
+                   IN %(birthdays)s
+            """,
+            {"today": today, "birthdays": tuple(birthdays)},
+        )
+        self.invalidate_model(["age"])
+        params.set_param("hr_hospital.age_last_run", fields.Date.to_string(today))
+
     @api.depends("first_name", "last_name")
     def _compute_name(self):
         """
@@ -94,6 +257,23 @@ class Patient(models.Model):
             "context": {"default_patient_id": self.id},
         }
 
+    def action_open_history(self):
+        """
+        Open the whole visit history of the patient, archived visits included.
+
+        Returns:
+            dict: An ir.actions.act_window listing all visits of the patient.
+        """
+        self.ensure_one()
+        return {
+            "name": "Visit History",
+            "type": "ir.actions.act_window",
+            "res_model": "hr.hospital.visit",
+            "view_mode": "tree,form",
+            "domain": [("patient_id", "=", self.id)],
+            "context": {"active_test": False, "default_patient_id": self.id},
+        }
+
     def action_create_visit(self):
         """
         Open a form to create a new visit for the patient.
@@ -113,3 +293,15 @@ class Patient(models.Model):
             },
             "target": "current",
         }
+
+    def action_export_visits(self):
+        """
+        Download the whole visit history of the patient as a CSV file.
+
+        Returns:
+            dict: An ir.actions.act_url streaming the export.
+        """
+        self.ensure_one()
+        return self.env["hr.hospital.export"].get_export_action(
+            "visit", [("patient_id", "=", self.id), ("active", "in", [True, False])]
+        )
@@ -0,0 +1,135 @@
+from odoo import api, fields, models
+
+from .profiling import profiled
+
+
+class PatientDuplicate(models.Model):
+    """
+    A cluster of patients that are probably the same person.
+
+    Clusters are rebuilt by the "Find Duplicate Patients" scheduled action.
+    Patients are blocked on their normalized keys (see
+    `hr.hospital.patient._compute_duplicate_keys`): each key shared by several
+    patients is one group found by a GROUP BY on the indexed key columns, and
+    groups sharing a patient are merged into a single cluster. No pair of
+    patients is compared directly, so the job stays linear in the number of
+    patients.
+    """
+
+    _name = "hr.hospital.patient.duplicate"
+    _description = "Possible Duplicate Patients"
+    _order = "patient_count desc, id"
+
+    name = fields.Char(required=True)
+    patient_ids = fields.Many2many(
+        "hr.hospital.patient",
+        "hr_hospital_patient_duplicate_rel",
+        "duplicate_id",
+        "patient_id",
+        string="Patients",
+    )
+    patient_count = fields.Integer(string="Patients")
+    match = fields.Selection(
+        [
+            ("passport", "Same Passport"),
+            ("identity", "Same Name, Birth Date and Phone"),
+            ("both", "Passport and Identity"),
+        ],
+        required=True,
+    )
+
+    @api.model
+    def _find_clusters(self):
+        """
+        Group the patients sharing a normalized key into clusters.
+
+        Returns:
+            list: One (patient ids, matched key types) pair per cluster.
+        """
+        self.env["hr.hospital.patient"].flush_model(["passport_key", "identity_key"])
+        self.env.cr.execute(
+            """
+            SELECT 'passport', array_agg(id)
+              FROM hr_hospital_patient
+             WHERE passport_key IS NOT NULL
+             GROUP BY passport_key
+            HAVING count(*) > 1
+             UNION ALL
+            SELECT 'identity', array_agg(id)
+              FROM hr_hospital_patient
+             WHERE identity_key IS NOT NULL
+             GROUP BY identity_key
+            HAVING count(*) > 1
+            """
+        )
+        # union-find over the patients of the groups
+        parent = {}
+        matches = {}
+
+        def find(patient_id):
+            root = parent.setdefault(patient_id, patient_id)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        for match, patient_ids in self.env.cr.fetchall():
+            root = find(patient_ids[0])
+            for patient_id in patient_ids[1:]:
+                other = find(patient_id)
+                if other != root:
+                    parent[other] = root
+                    matches.setdefault(root, set()).update(matches.pop(other, ()))
+            matches.setdefault(root, set()).add(match)
+
+        clusters = {}
+        for patient_id in parent:
+            clusters.setdefault(find(patient_id), []).append(patient_id)
+        return [
+            (sorted(patient_ids), matches[root])
+            for root, patient_ids in clusters.items()
+        ]
+
+    @api.model
+    @profiled
+    def _cron_find_duplicates(self):
+        """
+        Rebuild the clusters of possible duplicate patients.
+        """
+        clusters = self._find_clusters()
+        self.search([]).unlink()
+        patients = self.env["hr.hospital.patient"].browse(
+            [
+                patient_id
+                for patient_ids, _matches in clusters
+                for patient_id in patient_ids
+            ]
+        )
+        names = {patient.id: patient.name for patient in patients}
+        self.create(
+            [
+                {
+                    "name": names[patient_ids[0]],
+                    "patient_ids": [(6, 0, patient_ids)],
+                    "patient_count": len(patient_ids),
+                    "match": matches.pop() if len(matches) == 1 else "both",
+                }
+                for patient_ids, matches in clusters
+            ]
+        )
+
+    def action_open_patients(self):
+        """
+        Open the patients of the cluster, to compare and clean them up.
+
+        Returns:
+            dict: An ir.actions.act_window listing the patients.
+        """
+        self.ensure_one()
+        return {
+            "name": self.name,
+            "type": "ir.actions.act_window",
+            "res_model": "hr.hospital.patient",
+            "view_mode": "tree,form",
+            "domain": [("id", "in", self.patient_ids.ids)],
+        }
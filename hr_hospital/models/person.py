@@ -19,7 +19,15 @@ class Person(models.AbstractModel):
     first_name = fields.Char(string="First Name", required=True)
     last_name = fields.Char(string="Last Name", required=True)
     phone = fields.Char(string="Phone")
-    photo = fields.Image(string="Photo")
+    photo = fields.Image(string="Photo", max_width=1024, max_height=1024)
+    # Resized once when the photo is written; views load these through
+    # /web/image URLs, cached by the browser until the record changes.
+    photo_256 = fields.Image(
+        string="Photo 256", related="photo", max_width=256, max_height=256, store=True
+    )
+    photo_128 = fields.Image(
+        string="Photo 128", related="photo", max_width=128, max_height=128, store=True
+    )
     gender = fields.Selection([("male", "Male"), ("female", "Female")], string="Gender")
     user_id = fields.Many2one(
         "res.users",
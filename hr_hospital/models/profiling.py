@@ -0,0 +1,175 @@
+import contextlib
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from odoo import _, api, models
+from odoo.tools import str2bool
+
+_logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_local = threading.local()
+# {dbname: {method: {"calls": int, "queries": int, "time": float}}}
+_stats = defaultdict(dict)
+
+
+def _new_entry():
+    """
+    Return an empty statistics entry.
+    """
+    return {"calls": 0, "queries": 0, "time": 0.0}
+
+
+def _record(stats, key, queries, elapsed):
+    """
+    Add one call of the method `key` to the statistics dict `stats`.
+    """
+    entry = stats.setdefault(key, _new_entry())
+    entry["calls"] += 1
+    entry["queries"] += queries
+    entry["time"] += elapsed
+
+
+def profiled(method):
+    """
+    Decorator recording call count, SQL query count and wall time of a method.
+
+    Recording is opt-in: it happens when the `hr_hospital.profiling` system
+    parameter is set, or inside a `collect()` block (used by tests to assert
+    query budgets). Otherwise the decorated method runs unchanged.
+    Statistics are kept per database, in the memory of the worker process.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        collectors = getattr(_local, "collectors", ())
+        if not collectors and not self.env["hr.hospital.profiler"]._is_enabled():
+            return method(self, *args, **kwargs)
+        cr = self.env.cr
+        key = f"{self._name}.{method.__name__}"
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            queries = cr.sql_log_count - queries
+            for stats in collectors:
+                _record(stats, key, queries, elapsed)
+            with _lock:
+                _record(_stats[cr.dbname], key, queries, elapsed)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def collect():
+    """
+    Collect the statistics of the profiled methods called inside the block.
+
+    Yields:
+        dict: Statistics keyed by "<model>.<method>", filled in as methods run.
+    """
+    stats = {}
+    collectors = getattr(_local, "collectors", ())
+    _local.collectors = collectors + (stats,)
+    try:
+        yield stats
+    finally:
+        _local.collectors = collectors
+
+
+class HospitalProfiler(models.AbstractModel):
+    """
+    Access point to the hot-path statistics of the hospital models.
+
+    Hot methods of the hospital models are decorated with `profiled`. This model
+    reports what was recorded in the current worker: through `get_stats` (also
+    served as JSON by the `/hr_hospital/profiling` route), and as a log summary
+    from the "Log Profiling Summary" server action.
+    """
+
+    _name = "hr.hospital.profiler"
+    _description = "Hospital Profiler"
+
+    @api.model
+    def _is_enabled(self):
+        """
+        Return whether profiling is enabled by the `hr_hospital.profiling` parameter.
+        """
+        return str2bool(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("hr_hospital.profiling", "False"),
+            False,
+        )
+
+    @api.model
+    def get_stats(self):
+        """
+        Return the statistics recorded in this worker, slowest methods first.
+
+        Returns:
+            list: One dict per method, with call and query counts, total and
+            average time in milliseconds.
+        """
+        with _lock:
+            stats = {
+                key: dict(entry) for key, entry in _stats[self.env.cr.dbname].items()
+            }
+        return sorted(
+            (
+                {
+                    "method": key,
+                    "calls": entry["calls"],
+                    "queries": entry["queries"],
+                    "total_ms": round(entry["time"] * 1000, 3),
+                    "avg_ms": round(entry["time"] * 1000 / entry["calls"], 3),
+                    "avg_queries": round(entry["queries"] / entry["calls"], 2),
+                }
+                for key, entry in stats.items()
+            ),
+            key=lambda row: row["total_ms"],
+            reverse=True,
+        )
+
+    @api.model
+    def reset_stats(self):
+        """
+        Forget the statistics recorded in this worker.
+        """
+        with _lock:
+            _stats.pop(self.env.cr.dbname, None)
+
+    @api.model
+    def action_log_summary(self):
+        """
+        Write the recorded statistics to the server log.
+
+        Returns:
+            dict: A client action displaying a notification.
+        """
+        rows = self.get_stats()
+        _logger.info("Hospital profiling summary (%s methods):", len(rows))
+        for row in rows:
+            _logger.info(
+                "%-60s %8d calls %10d queries %12.1f ms",
+                row["method"],
+                row["calls"],
+                row["queries"],
+                row["total_ms"],
+            )
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Hospital Profiling"),
+                "message": _(
+                    "Summary of %s methods written to the server log.", len(rows)
+                ),
+                "type": "info",
+            },
+        }
@@ -1,7 +1,12 @@
+import hashlib
 from datetime import timedelta
 
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
+from odoo.modules import module as odoo_module
+from odoo.tools import SQL
+
+from .profiling import profiled
 
 
 class HospitalVisit(models.Model):
@@ -14,29 +19,372 @@ class HospitalVisit(models.Model):
 
     Business logic ensures visits cannot be modified once marked as done and prevents duplicates
     for the same doctor-patient-date combination.
+
+    Done and cancelled visits older than a cutoff are archived with their
+    diagnoses by a scheduled action (see `_cron_archive`): lists, calendars
+    and reports only read active visits, through partial indexes, while the
+    patient history still reads through to the archive.
     """
 
     _name = "hr.hospital.visit"
     _description = "Patient Visit"
 
+    active = fields.Boolean(
+        default=True,
+        help="Archived visits are kept in the patient history but left out of "
+        "lists, calendars and reports.",
+    )
     status = fields.Selection(
         [("planned", "Planned"), ("done", "Done"), ("cancelled", "Cancelled")],
         default="planned",
+        index=True,
     )
 
-    planned_datetime = fields.Datetime(string="Planned Date & Time")
-    actual_datetime = fields.Datetime(string="Actual Visit Time")
+    planned_datetime = fields.Datetime(string="Planned Date & Time", index=True)
+    planned_date = fields.Date(
+        string="Planned Day", compute="_compute_planned_date", store=True
+    )
+    actual_datetime = fields.Datetime(string="Actual Visit Time", index=True)
 
     doctor_id = fields.Many2one("hr.hospital.doctor", string="Doctor")
     patient_id = fields.Many2one("hr.hospital.patient", string="Patient")
     diagnosis_ids = fields.One2many(
-        "hr.hospital.diagnosis", "visit_id", string="Diagnoses"
+        "hr.hospital.diagnosis",
+        "visit_id",
+        string="Diagnoses",
+        context={"active_test": False},
     )
     notes = fields.Text(string="Notes")
+    access_user_ids = fields.Many2many(
+        "res.users",
+        "hr_hospital_visit_access_user_rel",
+        "visit_id",
+        "user_id",
+        string="Allowed Users",
+        compute="_compute_access_user_ids",
+        store=True,
+        help="Users of the visit's doctor and of their mentor, used by record rules.",
+    )
     visit_count = fields.Integer(
         string="Visit Count", compute="_compute_count", store=True
     )
 
+    _slot_fields = {"doctor_id", "planned_datetime", "status"}
+    _counter_fields = {"doctor_id", "patient_id", "status", "actual_datetime"}
+    _diagnosis_fields = {"doctor_id", "patient_id", "actual_datetime", "active"}
+    _doctor_counters = [
+        "visit_planned_count",
+        "visit_done_count",
+        "visit_cancelled_count",
+        "patient_count",
+        "last_visit_date",
+        "pending_diagnosis_count",
+    ]
+    _patient_counters = [
+        "visit_planned_count",
+        "visit_done_count",
+        "visit_cancelled_count",
+        "last_visit_date",
+        "pending_diagnosis_count",
+    ]
+
+    def init(self):
+        """
+        Create the composite indexes used by the hot access patterns:
+
+        - the duplicate-visit check on (doctor_id, patient_id, planned_date),
+        - the doctor calendar and report on (doctor_id, planned_datetime),
+        - the patient visit history on (patient_id, planned_datetime).
+
+        The last two also serve lookups on doctor_id or patient_id alone,
+        e.g. from the record rules, so those columns have no index of their own.
+
+        Lists and calendars only read active visits: partial indexes on
+        (doctor_id, planned_datetime) and planned_datetime of the active
+        visits keep them small however large the archive grows.
+        """
+        for name, columns in (
+            ("doctor_patient_day", ["doctor_id", "patient_id", "planned_date"]),
+            ("doctor_planned", ["doctor_id", "planned_datetime"]),
+            ("patient_planned", ["patient_id", "planned_datetime"]),
+        ):
+            tools.create_index(
+                self.env.cr, f"hr_hospital_visit_{name}_idx", self._table, columns
+            )
+        for name, columns in (
+            ("doctor_planned_active", ["doctor_id", "planned_datetime"]),
+            ("planned_active", ["planned_datetime"]),
+        ):
+            tools.create_index(
+                self.env.cr,
+                f"hr_hospital_visit_{name}_idx",
+                self._table,
+                columns,
+                where="active",
+            )
+
+    @api.model
+    def _rebuild_counters(self):
+        """
+        Recompute from scratch the visit counters of all doctors and patients.
+
+        Run by the 17.0.1.2.0 migration and after bulk SQL imports; in
+        between, the counters are kept up to date by `_update_counters`.
+        Pending diagnoses are those waiting for a mentor's approval: not
+        approved, on an active visit of an intern.
+        """
+        self.flush_model()
+        self.env["hr.hospital.diagnosis"].flush_model(["visit_id", "approved"])
+        self.env["hr.hospital.doctor"].flush_model(["is_intern"])
+        self.env.cr.execute(
+            """
+            UPDATE hr_hospital_doctor d
+               SET visit_planned_count = coalesce(visits.planned, 0),
+                   visit_done_count = coalesce(visits.done, 0),
+                   visit_cancelled_count = coalesce(visits.cancelled, 0),
+                   patient_count = coalesce(visits.patients, 0),
+                   last_visit_date = visits.last_visit,
+                   pending_diagnosis_count = coalesce(pending.count, 0)
+              FROM hr_hospital_doctor base
+              LEFT JOIN (
+                    SELECT doctor_id,
+                           count(*) FILTER (WHERE status = 'planned') AS planned,
+                           count(*) FILTER (WHERE status = 'done') AS done,
+                           count(*) FILTER (WHERE status = 'cancelled') AS cancelled,
+                           count(DISTINCT patient_id) AS patients,
+                           (max(actual_datetime) FILTER (WHERE status = 'done'))::date
+                               AS last_visit
+                      FROM hr_hospital_visit
+                     GROUP BY doctor_id
+                   ) visits ON visits.doctor_id = base.id
+              LEFT JOIN (
+                    SELECT v.doctor_id, count(*) AS count
+                      FROM hr_hospital_diagnosis g
+                      JOIN hr_hospital_visit v ON v.id = g.visit_id AND v.active
+                      JOIN hr_hospital_doctor doc
+                        ON doc.id = v.doctor_id AND doc.is_intern
+                     WHERE g.approved IS NOT TRUE
+                     GROUP BY v.doctor_id
+                   ) pending ON pending.doctor_id = base.id
+             WHERE d.id = base.id
+            """
+        )
+        self.env.cr.execute(
+            """
+            UPDATE hr_hospital_patient p
+               SET visit_planned_count = coalesce(visits.planned, 0),
+                   visit_done_count = coalesce(visits.done, 0),
+                   visit_cancelled_count = coalesce(visits.cancelled, 0),
+                   last_visit_date = visits.last_visit,
+                   pending_diagnosis_count = coalesce(pending.count, 0)
+              FROM hr_hospital_patient base
+              LEFT JOIN (
+                    SELECT patient_id,
+                           count(*) FILTER (WHERE status = 'planned') AS planned,
+                           count(*) FILTER (WHERE status = 'done') AS done,
+                           count(*) FILTER (WHERE status = 'cancelled') AS cancelled,
+                           (max(actual_datetime) FILTER (WHERE status = 'done'))::date
+                               AS last_visit
+                      FROM hr_hospital_visit
+                     GROUP BY patient_id
+                   ) visits ON visits.patient_id = base.id
+              LEFT JOIN (
+                    SELECT v.patient_id, count(*) AS count
+                      FROM hr_hospital_diagnosis g
+                      JOIN hr_hospital_visit v ON v.id = g.visit_id AND v.active
+                      JOIN hr_hospital_doctor doc
+                        ON doc.id = v.doctor_id AND doc.is_intern
+                     WHERE g.approved IS NOT TRUE
+                     GROUP BY v.patient_id
+                   ) pending ON pending.patient_id = base.id
+             WHERE p.id = base.id
+            """
+        )
+        self.env["hr.hospital.doctor"].invalidate_model(self._doctor_counters)
+        self.env["hr.hospital.patient"].invalidate_model(self._patient_counters)
+
+    @profiled
+    def _update_counters(self, sign):
+        """
+        Add (sign=1) or remove (sign=-1) the visits from the counters of their
+        doctors and patients, with one UPDATE per table.
+
+        Counters by status and of pending diagnoses are shifted by the visits'
+        contribution; only active visits of interns have pending diagnoses.
+        A doctor's patient count is shifted by the patients the doctor sees
+        only through these visits. The last visit date can only grow when
+        adding; when removing, the doctors and patients whose last visit date
+        may come from these visits are returned, to be recomputed by
+        `_refresh_last_visit_dates` once the change is done.
+
+        Returns:
+            tuple: The ids of the doctors and of the patients whose last visit
+            date is stale.
+        """
+        if not self.ids:
+            return [], []
+        self.flush_recordset([*self._counter_fields, "active"])
+        self.env["hr.hospital.diagnosis"].flush_model(["visit_id", "approved"])
+        self.env["hr.hospital.doctor"].flush_model(["is_intern"])
+        params = {"ids": tuple(self.ids), "sign": sign}
+        self.env.cr.execute(
+            """
+            WITH visits AS (
+                SELECT v.doctor_id, v.patient_id, v.status, v.actual_datetime,
+                       (SELECT count(*)
+                          FROM hr_hospital_diagnosis g
+                         WHERE g.visit_id = v.id AND g.approved IS NOT TRUE
+                           AND v.active AND doc.is_intern
+                       ) AS pending,
+                       NOT EXISTS (
+                           SELECT 1
+                             FROM hr_hospital_visit other
+                            WHERE other.doctor_id = v.doctor_id
+                              AND other.patient_id = v.patient_id
+                              AND other.id NOT IN %(ids)s
+                       ) AS only_visits
+                  FROM hr_hospital_visit v
+                  JOIN hr_hospital_doctor doc ON doc.id = v.doctor_id
+                 WHERE v.id IN %(ids)s
+            ), delta AS (
+                SELECT doctor_id,
+                       count(*) FILTER (WHERE status = 'planned') AS planned,
+                       count(*) FILTER (WHERE status = 'done') AS done,
+                       count(*) FILTER (WHERE status = 'cancelled') AS cancelled,
+                       count(DISTINCT patient_id) FILTER (WHERE only_visits)
+                           AS patients,
+                       sum(pending)::int AS pending,
+                       (max(actual_datetime) FILTER (WHERE status = 'done'))::date
+                           AS last_visit
+                  FROM visits
+                 GROUP BY doctor_id
+            )
+            UPDATE hr_hospital_doctor d
+               SET visit_planned_count = coalesce(d.visit_planned_count, 0)
+                                         + %(sign)s * delta.planned,
+                   visit_done_count = coalesce(d.visit_done_count, 0)
+                                      + %(sign)s * delta.done,
+                   visit_cancelled_count = coalesce(d.visit_cancelled_count, 0)
+                                           + %(sign)s * delta.cancelled,
+                   patient_count = coalesce(d.patient_count, 0)
+                                   + %(sign)s * delta.patients,
+                   pending_diagnosis_count = coalesce(d.pending_diagnosis_count, 0)
+                                             + %(sign)s * delta.pending,
+                   last_visit_date = CASE WHEN %(sign)s > 0
+                                          THEN greatest(d.last_visit_date,
+                                                        delta.last_visit)
+                                          ELSE d.last_visit_date END
+              FROM delta
+             WHERE d.id = delta.doctor_id
+            RETURNING d.id, delta.last_visit >= d.last_visit_date
+            """,
+            params,
+        )
+        doctor_ids = [doctor_id for doctor_id, stale in self.env.cr.fetchall() if stale]
+        self.env.cr.execute(
+            """
+            WITH visits AS (
+                SELECT v.patient_id, v.status, v.actual_datetime,
+                       (SELECT count(*)
+                          FROM hr_hospital_diagnosis g
+                         WHERE g.visit_id = v.id AND g.approved IS NOT TRUE
+                           AND v.active AND doc.is_intern
+                       ) AS pending
+                  FROM hr_hospital_visit v
+                  LEFT JOIN hr_hospital_doctor doc ON doc.id = v.doctor_id
+                 WHERE v.id IN %(ids)s AND v.patient_id IS NOT NULL
+            ), delta AS (
+                SELECT patient_id,
+                       count(*) FILTER (WHERE status = 'planned') AS planned,
+                       count(*) FILTER (WHERE status = 'done') AS done,
+                       count(*) FILTER (WHERE status = 'cancelled') AS cancelled,
+                       sum(pending)::int AS pending,
+                       (max(actual_datetime) FILTER (WHERE status = 'done'))::date
+                           AS last_visit
+                  FROM visits
+                 GROUP BY patient_id
+            )
+            UPDATE hr_hospital_patient p
+               SET visit_planned_count = coalesce(p.visit_planned_count, 0)
+                                         + %(sign)s * delta.planned,
+                   visit_done_count = coalesce(p.visit_done_count, 0)
+                                      + %(sign)s * delta.done,
+                   visit_cancelled_count = coalesce(p.visit_cancelled_count, 0)
+                                           + %(sign)s * delta.cancelled,
+                   pending_diagnosis_count = coalesce(p.pending_diagnosis_count, 0)
+                                             + %(sign)s * delta.pending,
+                   last_visit_date = CASE WHEN %(sign)s > 0
+                                          THEN greatest(p.last_visit_date,
+                                                        delta.last_visit)
+                                          ELSE p.last_visit_date END
+              FROM delta
+             WHERE p.id = delta.patient_id
+            RETURNING p.id, delta.last_visit >= p.last_visit_date
+            """,
+            params,
+        )
+        patient_ids = [
+            patient_id for patient_id, stale in self.env.cr.fetchall() if stale
+        ]
+        self.env["hr.hospital.doctor"].invalidate_model(self._doctor_counters)
+        self.env["hr.hospital.patient"].invalidate_model(self._patient_counters)
+        return doctor_ids, patient_ids
+
+    @api.model
+    def _refresh_last_visit_dates(self, doctor_ids, patient_ids):
+        """
+        Recompute the last visit date of the given doctors and patients.
+        """
+        if doctor_ids:
+            self.env.cr.execute(
+                """
+                UPDATE hr_hospital_doctor d
+                   SET last_visit_date = (
+                        SELECT max(actual_datetime)::date
+                          FROM hr_hospital_visit v
+                         WHERE v.doctor_id = d.id AND v.status = 'done'
+                       )
+                 WHERE d.id IN %s
+                """,
+                [tuple(doctor_ids)],
+            )
+            self.env["hr.hospital.doctor"].invalidate_model(["last_visit_date"])
+        if patient_ids:
+            self.env.cr.execute(
+                """
+                UPDATE hr_hospital_patient p
+                   SET last_visit_date = (
+                        SELECT max(actual_datetime)::date
+                          FROM hr_hospital_visit v
+                         WHERE v.patient_id = p.id AND v.status = 'done'
+                       )
+                 WHERE p.id IN %s
+                """,
+                [tuple(patient_ids)],
+            )
+            self.env["hr.hospital.patient"].invalidate_model(["last_visit_date"])
+
+    @api.depends("planned_datetime")
+    def _compute_planned_date(self):
+        """
+        Compute the day of the planned visit, used to detect duplicate visits.
+        """
+        for rec in self:
+            rec.planned_date = rec.planned_datetime and rec.planned_datetime.date()
+
+    @api.depends("doctor_id.user_id", "doctor_id.mentor_id.user_id")
+    def _compute_access_user_ids(self):
+        """
+        Compute the users allowed to see the visit through the doctor record rules.
+
+        Storing them flattens the doctor -> mentor -> user joins of the rules
+        into a lookup on an indexed relation table.
+        """
+        for rec in self:
+            rec.access_user_ids = (
+                rec.doctor_id.user_id | rec.doctor_id.mentor_id.user_id
+            )
+
     @api.depends()
     def _compute_count(self):
         """
@@ -48,6 +396,7 @@ class HospitalVisit(models.Model):
             rec.visit_count = 1
 
     @api.constrains("actual_datetime", "doctor_id", "status")
+    @profiled
     def _check_visit_constraints(self):
         """
         Prevent editing of visits that are marked as 'done'.
@@ -62,37 +411,311 @@ class HospitalVisit(models.Model):
                 raise ValidationError(_("You cannot change completed visit."))
 
     @api.constrains("doctor_id", "patient_id", "planned_datetime")
+    @profiled
     def _check_duplicate_visit(self):
         """
         Prevent scheduling multiple visits for the same doctor and patient on the same day.
 
+        The whole recordset is validated with a single query on the indexed
+        (doctor_id, patient_id, planned_date) columns. Visits without a planned
+        date are never considered duplicates.
+
         Raises:
             ValidationError: if a duplicate visit is found.
         """
-        for rec in self:
-            same_day_start = rec.planned_datetime.date()
-            visits = self.search(
-                [
-                    ("id", "!=", rec.id),
-                    ("doctor_id", "=", rec.doctor_id.id),
-                    ("patient_id", "=", rec.patient_id.id),
-                    ("planned_datetime", ">=", same_day_start),
-                    ("planned_datetime", "<", same_day_start + timedelta(days=1)),
-                ]
+        if not self.ids:
+            return
+        self.flush_model(["doctor_id", "patient_id", "planned_date"])
+        self.env.cr.execute(
+            """
+            SELECT 1
+              FROM hr_hospital_visit v
+              JOIN hr_hospital_visit other
+                ON other.doctor_id = v.doctor_id
+               AND other.patient_id = v.patient_id
+               AND other.planned_date = v.planned_date
+               AND other.id != v.id
+             WHERE v.id IN %s
+             LIMIT 1
+            """,
+            [tuple(self.ids)],
+        )
+        if self.env.cr.fetchone():
+            raise ValidationError(
+                _("This patient is already scheduled with this doctor on this day.")
             )
-            if visits:
-                raise ValidationError(
-                    _("This patient is already scheduled with this doctor on this day.")
-                )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        Count the new visits on their doctors and patients, and bypass the
+        cached free slots of their doctors until the transaction ends.
+        """
+        records = super().create(vals_list)
+        records._update_counters(1)
+        self.env["hr.hospital.availability"]._invalidate_doctors(records.doctor_id.ids)
+        return records
+
+    def write(self, vals):
+        """
+        Queue the diagnosis days affected by a change of the visit's doctor
+        or actual time, before and after it, for the diagnosis analysis,
+        copy the changed patient, doctor, time or archiving on the visits'
+        diagnoses,
+        move the visits' contribution to the counters of their doctors and
+        patients (only the pending diagnoses when archiving), and bypass the
+        cached free slots of the doctors involved.
+        """
+        analysis = self.env["hr.hospital.diagnosis.analysis"]
+        queue = "doctor_id" in vals or "actual_datetime" in vals
+        if queue:
+            analysis._queue_visits(self.ids)
+        counters = self._counter_fields.intersection(vals)
+        if counters:
+            stale = self._update_counters(-1)
+        elif "active" in vals:
+            diagnoses = (
+                self.env["hr.hospital.diagnosis"]
+                .sudo()
+                .with_context(active_test=False)
+                .search([("visit_id", "in", self.ids)])
+            )
+            diagnoses._update_pending_counters(-1)
+        doctors = self.doctor_id
+        res = super().write(vals)
+        if self._diagnosis_fields.intersection(vals):
+            self.env["hr.hospital.diagnosis"]._sync_visit_fields(self.ids)
+        if queue:
+            analysis._queue_visits(self.ids)
+        if counters:
+            self._update_counters(1)
+            self._refresh_last_visit_dates(*stale)
+        elif "active" in vals:
+            diagnoses._update_pending_counters(1)
+        if self._slot_fields.intersection(vals):
+            self.env["hr.hospital.availability"]._invalidate_doctors(
+                (doctors | self.doctor_id).ids
+            )
+        return res
+
+    @api.model
+    @profiled
+    def search_fetch(self, domain, field_names, *args, **kwargs):
+        """
+        Search and fetch visits; profiled to measure the cost of the record
+        rules, which are applied by the query executed here.
+        """
+        return super().search_fetch(domain, field_names, *args, **kwargs)
+
+    @api.model
+    @profiled
+    def search_count(self, domain, *args, **kwargs):
+        """
+        Count visits; profiled to measure the cost of the record rules.
+        """
+        return super().search_count(domain, *args, **kwargs)
+
+    @api.model
+    @profiled
+    def _cron_archive(self, batch_size=5000):
+        """
+        Archive the done and cancelled visits older than the cutoff, with
+        their diagnoses.
+
+        The cutoff is given in days by the `hr_hospital.archive_after_days`
+        system parameter (730 by default, 0 disables archiving) and applies to
+        the actual visit time, or the planned time when the visit never took
+        place. Visits are archived in batches, each committed outside of tests.
+        Visit counters of doctors and patients are left unchanged: they cover
+        the whole history. Archived diagnoses leave the pending counters, as
+        they leave the approval queue.
+
+        Returns:
+            int: The number of archived visits.
+        """
+        days = int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("hr_hospital.archive_after_days", 730)
+        )
+        if days <= 0:
+            return 0
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        self.flush_model(["active", "status", "planned_datetime", "actual_datetime"])
+        self.env.cr.execute(
+            """
+            SELECT id
+              FROM hr_hospital_visit
+             WHERE active
+               AND status IN ('done', 'cancelled')
+               AND coalesce(actual_datetime, planned_datetime) < %s
+             ORDER BY id
+            """,
+            [cutoff],
+        )
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        for batch in tools.split_every(batch_size, ids):
+            self.browse(batch).action_archive()
+            self.env.flush_all()
+            if not odoo_module.current_test:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        return len(ids)
+
+    @api.model
+    def _get_calendar_domain(self, start, stop, doctor_ids=None):
+        """
+        Return the domain of the visits planned within the [start, stop)
+        window of the calendar.
+
+        Args:
+            start (datetime|str): Start of the window (UTC).
+            stop (datetime|str): End of the window (UTC).
+            doctor_ids (list): Restrict to the visits of these doctors.
+        """
+        domain = [
+            ("planned_datetime", ">=", fields.Datetime.to_datetime(start)),
+            ("planned_datetime", "<", fields.Datetime.to_datetime(stop)),
+        ]
+        if doctor_ids:
+            domain += [("doctor_id", "in", doctor_ids)]
+        return domain
+
+    @api.model
+    def _search_calendar(self, start, stop, doctor_ids=None):
+        """
+        Return the visits planned within the [start, stop) window of the
+        calendar, as visible by the current user.
+        """
+        return self.search(
+            self._get_calendar_domain(start, stop, doctor_ids),
+            order="planned_datetime, id",
+        )
+
+    @api.model
+    @profiled
+    def _get_calendar_etag(self, start, stop, doctor_ids=None):
+        """
+        Return a fingerprint of the calendar events of a window, as visible
+        by the current user.
+
+        It is computed with one aggregate query over the visits of the window
+        (record rules applied), without loading them: their count, highest id
+        and latest write date of the visits, their doctors and patients. It
+        changes whenever a visit enters or leaves the window, or when one of
+        the visits, their doctors or patients is written, so unchanged
+        windows can be answered with "304 Not Modified" without reading the
+        events.
+        """
+        query = self._search(self._get_calendar_domain(start, stop, doctor_ids))
+        self.flush_model(["write_date"])
+        self.env["hr.hospital.doctor"].flush_model(["write_date"])
+        self.env["hr.hospital.patient"].flush_model(["write_date"])
+        self.env.cr.execute(
+            SQL(
+                """
+                SELECT count(*), max(v.id),
+                       max(greatest(v.write_date, d.write_date, p.write_date))
+                  FROM hr_hospital_visit v
+                  LEFT JOIN hr_hospital_doctor d ON d.id = v.doctor_id
+                  LEFT JOIN hr_hospital_patient p ON p.id = v.patient_id
+                 WHERE v.id IN (%s)
+                """,
+                query.select(),
+            )
+        )
+        count, last_id, last_write = self.env.cr.fetchone()
+        key = (
+            f"{self.env.cr.dbname}|{self.env.uid}|{self.env.lang}|{start}|{stop}|"
+            f"{sorted(doctor_ids or [])}|{count}|{last_id}|{last_write}"
+        )
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    @profiled
+    def _read_calendar(self):
+        """
+        Read the calendar events of the visits with one query, doctor and
+        patient names joined in.
+
+        Returns:
+            list: One dict per visit, ordered by planned time, with UTC times
+            as strings.
+        """
+        if not self.ids:
+            return []
+        self.flush_recordset(
+            ["planned_datetime", "actual_datetime", "status", "doctor_id", "patient_id"]
+        )
+        self.env["hr.hospital.doctor"].flush_model(["name"])
+        self.env["hr.hospital.patient"].flush_model(["name"])
+        self.env.cr.execute(
+            """
+            SELECT v.id, v.planned_datetime, v.actual_datetime, v.status,
+                   v.doctor_id, d.name, v.patient_id, p.name
+              FROM hr_hospital_visit v
+              LEFT JOIN hr_hospital_doctor d ON d.id = v.doctor_id
+              LEFT JOIN hr_hospital_patient p ON p.id = v.patient_id
+             WHERE v.id IN %s
+             ORDER BY v.planned_datetime, v.id
+            """,
+            [tuple(self.ids)],
+        )
+        statuses = dict(self._fields["status"]._description_selection(self.env))
+        return [
+            {
+                "id": visit_id,
+                "start": fields.Datetime.to_string(planned),
+                "stop": fields.Datetime.to_string(actual or planned),
+                "status": status,
+                "status_label": statuses.get(status, ""),
+                "doctor_id": [doctor_id, doctor_name] if doctor_id else False,
+                "patient_id": [patient_id, patient_name] if patient_id else False,
+            }
+            for (
+                visit_id,
+                planned,
+                actual,
+                status,
+                doctor_id,
+                doctor_name,
+                patient_id,
+                patient_name,
+            ) in self.env.cr.fetchall()
+        ]
+
+    @profiled
     def unlink(self):
         """
         Prevent deletion of visits that have diagnoses.
 
+        The whole recordset is checked with a single grouped query on
+        diagnoses, archived ones included, and the error lists the visits
+        that blocked the deletion. Deleted visits are removed from the
+        counters of their doctors and patients.
+
         Raises:
             ValidationError: if the visit has linked diagnosis records.
         """
-        for rec in self:
-            if rec.diagnosis_ids:
-                raise ValidationError(_("You cannot delete visits with diagnoses."))
-        return super().unlink()
+        groups = (
+            self.env["hr.hospital.diagnosis"]
+            .sudo()
+            .with_context(active_test=False)
+            ._read_group([("visit_id", "in", self.ids)], ["visit_id"])
+        )
+        if groups:
+            blocked = self.browse([visit.id for (visit,) in groups])
+            raise ValidationError(
+                _(
+                    "You cannot delete visits with diagnoses:\n%s",
+                    "\n".join(
+                        f"{visit.patient_id.name or ''} "
+                        f"({visit.planned_datetime or visit.actual_datetime or ''})"
+                        for visit in blocked[:10]
+                    ),
+                )
+            )
+        self.env["hr.hospital.availability"]._invalidate_doctors(self.doctor_id.ids)
+        stale = self._update_counters(-1)
+        res = super().unlink()
+        self._refresh_last_visit_dates(*stale)
+        return res
@@ -1 +1,7 @@
-from . import report_doctor
+from . import (
+    diagnosis_analysis,
+    hospital_export,
+    report_cache,
+    report_doctor,
+    report_job,
+)
@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from ..models.profiling import profiled
+
+
+class DiagnosisAnalysis(models.Model):
+    """
+    Pre-aggregated diagnosis statistics used by the pivot and graph views.
+
+    Each row holds the number of diagnoses for one combination of day, doctor,
+    specialty, disease and intern/approval flags. Rows are not written through
+    the ORM: diagnosis, visit, doctor and disease changes push the affected days
+    into a queue table, and `_refresh` re-aggregates only those days. Dashboard
+    queries therefore read a small table whose size does not depend on the
+    number of diagnoses recorded per day.
+
+    Diagnoses without a diagnosis date (visits not performed yet) are not
+    included in the analysis.
+    """
+
+    _name = "hr.hospital.diagnosis.analysis"
+    _description = "Diagnosis Analysis"
+    _log_access = False
+    _order = "date desc"
+
+    date = fields.Date(string="Day", readonly=True, index=True)
+    doctor_id = fields.Many2one("hr.hospital.doctor", string="Doctor", readonly=True)
+    specialty_id = fields.Many2one(
+        "hr.hospital.specialty", string="Specialty", readonly=True
+    )
+    disease_id = fields.Many2one("hr.hospital.disease", string="Disease", readonly=True)
+    disease_category_id = fields.Many2one(
+        "hr.hospital.disease", string="Disease Category", readonly=True
+    )
+    is_intern = fields.Boolean(string="By Intern", readonly=True)
+    approved = fields.Boolean(string="Approved by Mentor", readonly=True)
+    diagnosis_count = fields.Integer(string="Diagnoses", readonly=True)
+
+    def init(self):
+        """
+        Create the queue of days waiting to be re-aggregated.
+
+        When the analysis is empty, every day that has diagnoses is queued,
+        so the first refresh after installation builds the full table.
+        """
+        cr = self.env.cr
+        cr.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hr_hospital_diagnosis_analysis_queue (
+                day date PRIMARY KEY
+            )
+            """
+        )
+        cr.execute("SELECT 1 FROM hr_hospital_diagnosis_analysis LIMIT 1")
+        if not cr.fetchone():
+            cr.execute(
+                """
+                INSERT INTO hr_hospital_diagnosis_analysis_queue (day)
+                SELECT DISTINCT diagnosis_date::date
+                  FROM hr_hospital_diagnosis
+                 WHERE diagnosis_date IS NOT NULL
+                ON CONFLICT DO NOTHING
+                """
+            )
+
+    @api.model
+    def _queue_diagnoses(self, diagnosis_ids):
+        """
+        Queue the days of the given diagnoses for re-aggregation.
+        """
+        if not diagnosis_ids:
+            return
+        self.env["hr.hospital.diagnosis"].flush_model(["diagnosis_date"])
+        self.env.cr.execute(
+            """
+            INSERT INTO hr_hospital_diagnosis_analysis_queue (day)
+            SELECT DISTINCT diagnosis_date::date
+              FROM hr_hospital_diagnosis
+             WHERE id IN %s
+               AND diagnosis_date IS NOT NULL
+            ON CONFLICT DO NOTHING
+            """,
+            [tuple(diagnosis_ids)],
+        )
+
+    @api.model
+    def _queue_visits(self, visit_ids):
+        """
+        Queue the days of all diagnoses made during the given visits.
+        """
+        if not visit_ids:
+            return
+        diagnoses = (
+            self.env["hr.hospital.diagnosis"]
+            .with_context(active_test=False)
+            .search([("visit_id", "in", visit_ids)])
+        )
+        self._queue_diagnoses(diagnoses.ids)
+
+    @api.model
+    def _queue_doctors(self, doctor_ids):
+        """
+        Queue the days of all diagnoses made by the given doctors.
+        """
+        if not doctor_ids:
+            return
+        self.env["hr.hospital.diagnosis"].flush_model(["doctor_id", "diagnosis_date"])
+        self.env.cr.execute(
+            """
+            INSERT INTO hr_hospital_diagnosis_analysis_queue (day)
+            SELECT DISTINCT diagnosis_date::date
+              FROM hr_hospital_diagnosis
+             WHERE doctor_id IN %s
+               AND diagnosis_date IS NOT NULL
+            ON CONFLICT DO NOTHING
+            """,
+            [tuple(doctor_ids)],
+        )
+
+    @api.model
+    @profiled
+    def _refresh(self):
+        """
+        Re-aggregate every queued day and empty the queue.
+
+        Returns:
+            int: The number of days that were refreshed.
+        """
+        self.env["hr.hospital.diagnosis"].flush_model()
+        self.env["hr.hospital.doctor"].flush_model(["specialty_id", "is_intern"])
+        cr = self.env.cr
+        cr.execute("DELETE FROM hr_hospital_diagnosis_analysis_queue RETURNING day")
+        days = tuple(row[0] for row in cr.fetchall())
+        if not days:
+            return 0
+        window = (min(days), max(days) + timedelta(days=1))
+        cr.execute(
+            "DELETE FROM hr_hospital_diagnosis_analysis WHERE date IN %s", [days]
+        )
+        cr.execute(
+            """
+            INSERT INTO hr_hospital_diagnosis_analysis (
+                date, doctor_id, specialty_id, disease_id, disease_category_id,
+                is_intern, approved, diagnosis_count
+            )
+            SELECT diagnosis.diagnosis_date::date,
+                   diagnosis.doctor_id,
+                   doctor.specialty_id,
+                   diagnosis.disease_id,
+                   diagnosis.disease_category_id,
+                   COALESCE(doctor.is_intern, FALSE),
+                   COALESCE(diagnosis.approved, FALSE),
+                   COUNT(*)
+              FROM hr_hospital_diagnosis diagnosis
+              LEFT JOIN hr_hospital_doctor doctor
+                ON doctor.id = diagnosis.doctor_id
+             WHERE diagnosis.diagnosis_date >= %s
+               AND diagnosis.diagnosis_date < %s
+               AND diagnosis.diagnosis_date::date IN %s
+             GROUP BY 1, 2, 3, 4, 5, 6, 7
+            """,
+            [*window, days],
+        )
+        self.invalidate_model()
+        return len(days)
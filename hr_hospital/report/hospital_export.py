@@ -0,0 +1,241 @@
+import csv
+import io
+import json
+from urllib.parse import urlencode
+
+from odoo import _, _lt, api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools.misc import xlsxwriter
+
+from ..models.profiling import profiled
+
+
+class HospitalExport(models.AbstractModel):
+    """
+    Streaming export of diagnoses and visits to CSV or XLSX.
+
+    Records are walked by keyset chunks (`id > last id`, ordered by id) with
+    the user's access rights applied, and each chunk is read with one SQL
+    query joining the doctor, patient and disease names. Only one chunk is in
+    memory at a time: CSV is yielded chunk by chunk to the HTTP response, and
+    XLSX is written by xlsxwriter in constant memory mode to a file.
+    """
+
+    _name = "hr.hospital.export"
+    _description = "Hospital Export"
+
+    _chunk_size = 5000
+    _xlsx_max_rows = 1048576
+
+    # {kind: (model, column titles)}
+    _kinds = {
+        "diagnosis": (
+            "hr.hospital.diagnosis",
+            [
+                _lt("ID"),
+                _lt("Date"),
+                _lt("Doctor"),
+                _lt("Patient"),
+                _lt("Disease"),
+                _lt("Disease Category"),
+                _lt("Approved"),
+                _lt("Treatment Notes"),
+            ],
+        ),
+        "visit": (
+            "hr.hospital.visit",
+            [
+                _lt("ID"),
+                _lt("Planned Date & Time"),
+                _lt("Actual Visit Time"),
+                _lt("Status"),
+                _lt("Doctor"),
+                _lt("Patient"),
+                _lt("Notes"),
+            ],
+        ),
+    }
+
+    @api.model
+    def _check_kind(self, kind):
+        """
+        Return the model exported for `kind`.
+
+        Raises:
+            UserError: if `kind` cannot be exported.
+        """
+        if kind not in self._kinds:
+            raise UserError(_("Unknown export: %s", kind))
+        return self.env[self._kinds[kind][0]]
+
+    @api.model
+    def get_export_action(self, kind, domain, file_format="csv"):
+        """
+        Return an action downloading the records of `domain` as a file.
+
+        Args:
+            kind (str): "diagnosis" or "visit".
+            domain (list): Domain of the exported records. Dates must be
+                given as strings.
+            file_format (str): "csv" or "xlsx".
+
+        Returns:
+            dict: An ir.actions.act_url pointing to the export route.
+        """
+        self._check_kind(kind)
+        query = urlencode({"domain": json.dumps(domain), "format": file_format})
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/hr_hospital/export/{kind}?{query}",
+            "target": "self",
+        }
+
+    @api.model
+    @profiled
+    def _read_diagnosis_rows(self, ids):
+        """
+        Read the export rows of the given diagnoses, names joined in.
+        """
+        self.env.cr.execute(
+            """
+            SELECT g.id, g.diagnosis_date, doctor.name, patient.name,
+                   disease.name, category.name, g.approved, g.description
+              FROM hr_hospital_diagnosis g
+              JOIN hr_hospital_visit v ON v.id = g.visit_id
+              LEFT JOIN hr_hospital_doctor doctor ON doctor.id = v.doctor_id
+              LEFT JOIN hr_hospital_patient patient ON patient.id = v.patient_id
+              LEFT JOIN hr_hospital_disease disease ON disease.id = g.disease_id
+              LEFT JOIN hr_hospital_disease category
+                     ON category.id = g.disease_category_id
+             WHERE g.id IN %s
+             ORDER BY g.id
+            """,
+            [tuple(ids)],
+        )
+        return [
+            (
+                diagnosis_id,
+                fields.Datetime.to_string(diagnosis_date) or "",
+                doctor or "",
+                patient or "",
+                disease or "",
+                category or "",
+                _("Yes") if approved else _("No"),
+                description or "",
+            )
+            for (
+                diagnosis_id,
+                diagnosis_date,
+                doctor,
+                patient,
+                disease,
+                category,
+                approved,
+                description,
+            ) in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    @profiled
+    def _read_visit_rows(self, ids):
+        """
+        Read the export rows of the given visits, names joined in.
+        """
+        statuses = dict(
+            self.env["hr.hospital.visit"]
+            ._fields["status"]
+            ._description_selection(self.env)
+        )
+        self.env.cr.execute(
+            """
+            SELECT v.id, v.planned_datetime, v.actual_datetime, v.status,
+                   doctor.name, patient.name, v.notes
+              FROM hr_hospital_visit v
+              LEFT JOIN hr_hospital_doctor doctor ON doctor.id = v.doctor_id
+              LEFT JOIN hr_hospital_patient patient ON patient.id = v.patient_id
+             WHERE v.id IN %s
+             ORDER BY v.id
+            """,
+            [tuple(ids)],
+        )
+        return [
+            (
+                visit_id,
+                fields.Datetime.to_string(planned) or "",
+                fields.Datetime.to_string(actual) or "",
+                statuses.get(status, status or ""),
+                doctor or "",
+                patient or "",
+                notes or "",
+            )
+            for (
+                visit_id,
+                planned,
+                actual,
+                status,
+                doctor,
+                patient,
+                notes,
+            ) in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    def _iter_chunks(self, kind, domain):
+        """
+        Yield the export rows of the records of `domain`, one chunk at a time.
+        """
+        model = self._check_kind(kind)
+        model.flush_model()
+        read_rows = getattr(self, f"_read_{kind}_rows")
+        last_id = 0
+        while True:
+            ids = model.search(
+                domain + [("id", ">", last_id)], order="id", limit=self._chunk_size
+            ).ids
+            if not ids:
+                return
+            yield read_rows(ids)
+            last_id = ids[-1]
+            self.env.invalidate_all()
+
+    @api.model
+    def iter_csv(self, kind, domain):
+        """
+        Yield the CSV export of the records of `domain` as encoded chunks.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow([str(title) for title in self._kinds[kind][1]])
+        for rows in self._iter_chunks(kind, domain):
+            writer.writerows(rows)
+            yield output.getvalue().encode()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue().encode()
+
+    @api.model
+    def write_xlsx(self, kind, domain, fileobj):
+        """
+        Write the XLSX export of the records of `domain` to `fileobj`.
+
+        The workbook is written in constant memory mode: each row is flushed
+        to disk once the next one starts.
+        """
+        workbook = xlsxwriter.Workbook(
+            fileobj, {"constant_memory": True, "in_memory": False}
+        )
+        bold = workbook.add_format({"bold": True})
+        titles = [str(title) for title in self._kinds[kind][1]]
+        sheet, row_index = None, self._xlsx_max_rows
+        for rows in self._iter_chunks(kind, domain):
+            for row in rows:
+                if row_index == self._xlsx_max_rows:
+                    # a worksheet is limited to 1048576 rows: continue on a new one
+                    sheet = workbook.add_worksheet()
+                    sheet.write_row(0, 0, titles, bold)
+                    row_index = 1
+                sheet.write_row(row_index, 0, row)
+                row_index += 1
+        if sheet is None:
+            workbook.add_worksheet().write_row(0, 0, titles, bold)
+        workbook.close()
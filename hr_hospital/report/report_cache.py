@@ -0,0 +1,62 @@
+from odoo import api, fields, models
+
+
+class HospitalReportCache(models.Model):
+    """
+    The last doctor report rendered for a user, reused by report jobs while
+    its fingerprint (see `hr.hospital.report.job._get_fingerprints`) holds.
+
+    Reports are rendered with the record rules of their user, so each entry
+    is private to it: the PDF is attached to the entry, and a global record
+    rule restricts entries, and so their attachments, to their user. Jobs
+    keep copies of the reports they serve, so an entry is replaced freely.
+    """
+
+    _name = "hr.hospital.report.cache"
+    _description = "Cached Doctor Report"
+
+    user_id = fields.Many2one(
+        "res.users", required=True, readonly=True, ondelete="cascade"
+    )
+    doctor_id = fields.Many2one(
+        "hr.hospital.doctor", required=True, readonly=True, ondelete="cascade"
+    )
+    fingerprint = fields.Char(required=True, readonly=True)
+    attachment_id = fields.Many2one("ir.attachment", readonly=True)
+
+    _sql_constraints = [
+        (
+            "user_doctor_uniq",
+            "UNIQUE(user_id, doctor_id)",
+            "A user has one cached report per doctor.",
+        )
+    ]
+
+    @api.model
+    def _store(self, user, doctor, fingerprint, content):
+        """
+        Store the report of a doctor rendered for a user, replacing the
+        previous one.
+
+        Returns:
+            hr.hospital.report.cache: The cache entry.
+        """
+        entry = self.search([("user_id", "=", user.id), ("doctor_id", "=", doctor.id)])
+        if not entry:
+            entry = self.create(
+                {"user_id": user.id, "doctor_id": doctor.id, "fingerprint": fingerprint}
+            )
+        previous = entry.attachment_id
+        attachment = self.env["ir.attachment"].create(
+            {
+                # the id keeps the names of namesake doctors apart in a job's zip
+                "name": f"Doctor Report - {doctor.name} ({doctor.id}).pdf",
+                "raw": content,
+                "mimetype": "application/pdf",
+                "res_model": self._name,
+                "res_id": entry.id,
+            }
+        )
+        entry.write({"fingerprint": fingerprint, "attachment_id": attachment.id})
+        previous.unlink()
+        return entry
@@ -1,6 +1,9 @@
 from datetime import datetime
 
 from odoo import models
+from odoo.tools import SQL
+
+from ..models.profiling import profiled
 
 
 class ReportDoctorTemplate(models.AbstractModel):
@@ -11,36 +14,126 @@ class ReportDoctorTemplate(models.AbstractModel):
     per patient associated with the doctor. It is rendered via QWeb
     using the XML template `report_hr_hospital.report_doctor_template`.
 
+    Visits are not read upfront: the template calls `get_visits` and
+    `get_latest_visits` for one doctor at a time, so a batch of many doctors
+    only keeps the visits of the doctor being rendered in memory.
+
     The model name must match the template's `report_xxx` declaration.
     """
 
     _name = "report.hr_hospital.report_doctor_template"
     _description = "Doctor Report"
 
+    def _get_visit_domain(self, doctor, data):
+        """
+        Build the visit domain of a doctor, restricted to the optional date window.
+
+        Args:
+            doctor (record): The hr.hospital.doctor record.
+            data (dict): Report data, may contain `date_from` and `date_to`.
+
+        Returns:
+            list: A search domain on hr.hospital.visit.
+        """
+        domain = [("doctor_id", "=", doctor.id)]
+        if data.get("date_from"):
+            domain += [("planned_datetime", ">=", data["date_from"])]
+        if data.get("date_to"):
+            domain += [("planned_datetime", "<=", data["date_to"])]
+        return domain
+
+    @profiled
+    def _get_visits(self, doctor, data):
+        """
+        Return the doctor's visits, most recent first.
+
+        Sorting and the optional row cap (`visit_limit` in data) are applied
+        in SQL.
+        """
+        return self.env["hr.hospital.visit"].search(
+            self._get_visit_domain(doctor, data),
+            order="planned_datetime desc nulls last, id desc",
+            limit=data.get("visit_limit"),
+        )
+
+    def _get_hidden_visit_count(self, doctor, data):
+        """
+        Return the number of the doctor's visits left out by `visit_limit`.
+        """
+        limit = data.get("visit_limit")
+        if not limit:
+            return 0
+        count = self.env["hr.hospital.visit"].search_count(
+            self._get_visit_domain(doctor, data)
+        )
+        return max(count - limit, 0)
+
+    @profiled
+    def _get_latest_visits(self, doctor, data):
+        """
+        Return the most recent visit of each patient of the doctor.
+
+        The latest visit is picked in SQL with DISTINCT ON, using the actual
+        visit time when known and the planned time otherwise, and visits are
+        sorted by patient name in the same query. The visits of the domain
+        are selected by a subquery with the record rules applied, so their
+        ids never go through Python.
+        """
+        Visit = self.env["hr.hospital.visit"]
+        Visit.flush_model(
+            ["doctor_id", "patient_id", "planned_datetime", "actual_datetime"]
+        )
+        self.env["hr.hospital.patient"].flush_model(["name"])
+        visits = Visit._search(self._get_visit_domain(doctor, data))
+        self.env.cr.execute(
+            SQL(
+                """
+                SELECT latest.id
+                  FROM (
+                    SELECT DISTINCT ON (v.patient_id) v.id, v.patient_id
+                      FROM hr_hospital_visit v
+                     WHERE v.id IN (%s)
+                       AND v.patient_id IS NOT NULL
+                     ORDER BY v.patient_id,
+                              COALESCE(v.actual_datetime, v.planned_datetime)
+                                  DESC NULLS LAST,
+                              v.id DESC
+                  ) latest
+                  JOIN hr_hospital_patient p ON p.id = latest.patient_id
+                 ORDER BY p.name, latest.id
+                """,
+                visits.select(),
+            )
+        )
+        return Visit.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @profiled
     def _get_report_values(self, docids, data=None):
         """
         Provide the data dictionary required by the QWeb report rendering engine.
 
         Args:
             docids (list): List of doctor record IDs to include in the report.
-            data (dict): Additional data passed to the report (unused).
+            data (dict): Additional data passed to the report. Supports
+                `date_from`, `date_to` (visit window) and `visit_limit`
+                (maximum visits listed per doctor).
 
         Returns:
             dict: A dictionary with context values for rendering the report template.
         """
+        data = data or {}
         docs = self.env["hr.hospital.doctor"].browse(docids)
-        latest_visits = {}
-        for doctor in docs:
-            for visit in doctor.visit_ids:
-                pid = str(visit.patient_id.id)
-                latest_visits[pid] = visit
         now = datetime.now()
         formatted_now = now.strftime("%Y-%m-%d %H:%M")
         return {
             "doc_ids": docids,
             "doc_model": "hr.hospital.doctor",
             "docs": docs,
-            "latest_visits": latest_visits,
+            "get_visits": lambda doctor: self._get_visits(doctor, data),
+            "get_latest_visits": lambda doctor: self._get_latest_visits(doctor, data),
+            "get_hidden_visit_count": lambda doctor: self._get_hidden_visit_count(
+                doctor, data
+            ),
             "company": self.env.company,
             "now": formatted_now,
         }
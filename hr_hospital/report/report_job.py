@@ -0,0 +1,322 @@
+import base64
+import hashlib
+import io
+import logging
+import time
+import zipfile
+
+from odoo import _, api, fields, models
+from odoo.modules import module as odoo_module
+
+from ..models.profiling import profiled
+
+_logger = logging.getLogger(__name__)
+
+
+class HospitalReportJob(models.Model):
+    """
+    A queued rendering of the doctor report for a set of doctors.
+
+    Printing the report of every doctor in the HTTP request holds a worker for
+    minutes. A job instead lists the doctors to render, and the "Render Doctor
+    Reports" scheduled action renders them in chunks of `_chunk_size` doctors,
+    committing after every chunk (outside of tests). Each report is attached
+    to the job as a PDF; once all are rendered they are bundled in a zip file
+    downloadable from the job.
+
+    Rendered reports are cached per user in `hr.hospital.report.cache`, with
+    a fingerprint of what the report shows (count and latest write date of
+    the doctor's active visits and of their patients, the doctor, the user
+    and the language). A doctor whose fingerprint did not change is not
+    rendered again, so a job over unchanged doctors is done as soon as it is
+    started. Jobs keep their own copy of each report, unaffected by later
+    renderings.
+    """
+
+    _name = "hr.hospital.report.job"
+    _description = "Doctor Report Job"
+    _order = "id desc"
+
+    _chunk_size = 10
+    # Seconds of rendering per run of the scheduled action, which triggers
+    # itself again when jobs are left
+    _time_budget = 300
+
+    name = fields.Char(required=True, default=lambda self: _("Doctor Reports"))
+    user_id = fields.Many2one(
+        "res.users",
+        string="Requested By",
+        required=True,
+        readonly=True,
+        index=True,
+        default=lambda self: self.env.user,
+    )
+    state = fields.Selection(
+        [("queued", "Queued"), ("done", "Done"), ("failed", "Failed")],
+        default="queued",
+        required=True,
+        readonly=True,
+    )
+    doctor_ids = fields.Many2many(
+        "hr.hospital.doctor",
+        "hr_hospital_report_job_doctor_rel",
+        "job_id",
+        "doctor_id",
+        string="Doctors",
+        readonly=True,
+    )
+    pending_doctor_ids = fields.Many2many(
+        "hr.hospital.doctor",
+        "hr_hospital_report_job_pending_rel",
+        "job_id",
+        "doctor_id",
+        string="Doctors to Render",
+        readonly=True,
+    )
+    attachment_ids = fields.Many2many(
+        "ir.attachment",
+        "hr_hospital_report_job_attachment_rel",
+        "job_id",
+        "attachment_id",
+        string="Reports",
+        readonly=True,
+    )
+    doctor_count = fields.Integer(compute="_compute_progress")
+    rendered_count = fields.Integer(compute="_compute_progress")
+    result_id = fields.Many2one("ir.attachment", readonly=True)
+    error = fields.Text(readonly=True)
+
+    @api.depends("doctor_ids", "pending_doctor_ids")
+    def _compute_progress(self):
+        """
+        Compute the number of doctors of the job and of those already rendered.
+        """
+        for job in self:
+            job.doctor_count = len(job.doctor_ids)
+            job.rendered_count = job.doctor_count - len(job.pending_doctor_ids)
+
+    @profiled
+    def _get_fingerprints(self, doctors):
+        """
+        Return the fingerprint of the report of each doctor, with one query.
+
+        Returns:
+            dict: Fingerprints keyed by doctor id.
+        """
+        self.env["hr.hospital.visit"].flush_model(
+            ["doctor_id", "patient_id", "active", "write_date"]
+        )
+        self.env["hr.hospital.patient"].flush_model(["write_date"])
+        self.env["hr.hospital.doctor"].flush_model(["specialty_id", "write_date"])
+        self.env.cr.execute(
+            """
+            SELECT d.id, d.write_date, s.write_date, count(v.id),
+                   max(v.write_date), max(p.write_date)
+              FROM hr_hospital_doctor d
+              LEFT JOIN hr_hospital_specialty s ON s.id = d.specialty_id
+              LEFT JOIN hr_hospital_visit v
+                     ON v.doctor_id = d.id
+                    AND v.active
+              LEFT JOIN hr_hospital_patient p ON p.id = v.patient_id
+             WHERE d.id IN %s
+             GROUP BY d.id, s.write_date
+            """,
+            [tuple(doctors.ids)],
+        )
+        base = (
+            f"{self.user_id.id}|{self.user_id.lang}|"
+            f"{self.env.company.partner_id.write_date}"
+        )
+        return {
+            doctor_id: hashlib.sha1(
+                f"{base}|{'|'.join(map(str, row))}".encode()
+            ).hexdigest()
+            for doctor_id, *row in self.env.cr.fetchall()
+        }
+
+    def _get_cached_reports(self, fingerprints):
+        """
+        Return the cached reports of the job's user matching the given
+        fingerprints.
+
+        Returns:
+            dict: hr.hospital.report.cache records keyed by doctor id.
+        """
+        entries = (
+            self.env["hr.hospital.report.cache"]
+            .sudo()
+            .search(
+                [
+                    ("user_id", "=", self.user_id.id),
+                    ("doctor_id", "in", list(fingerprints)),
+                ]
+            )
+        )
+        return {
+            entry.doctor_id.id: entry
+            for entry in entries
+            if entry.attachment_id
+            and entry.fingerprint == fingerprints[entry.doctor_id.id]
+        }
+
+    def _copy_reports(self, entries):
+        """
+        Attach a copy of the cached reports to the job.
+
+        Returns:
+            ir.attachment: The copies.
+        """
+        copies = self.env["ir.attachment"].sudo()
+        for entry in entries:
+            copies |= entry.attachment_id.copy(
+                {"res_model": self._name, "res_id": self.id}
+            )
+        return copies
+
+    def _render_reports(self, doctors):
+        """
+        Return the reports of the doctors, rendering those not in the cache.
+
+        Reports are rendered as the user who requested the job, so record
+        rules apply, and cached for that user.
+
+        Returns:
+            hr.hospital.report.cache: One entry per doctor.
+        """
+        fingerprints = self._get_fingerprints(doctors)
+        cached = self._get_cached_reports(fingerprints)
+        Cache = self.env["hr.hospital.report.cache"].sudo()
+        report = self.env["ir.actions.report"].with_user(self.user_id)
+        if self.user_id.lang:
+            report = report.with_context(lang=self.user_id.lang)
+        entries = Cache
+        for doctor in doctors:
+            entry = cached.get(doctor.id)
+            if not entry:
+                content, _format = report._render_qweb_pdf(
+                    "hr_hospital.action_doctor_report", [doctor.id]
+                )
+                entry = Cache._store(
+                    self.user_id, doctor, fingerprints[doctor.id], content
+                )
+            entries |= entry
+        return entries
+
+    def _finish(self):
+        """
+        Mark the job done and bundle its reports in its result file.
+        """
+        attachments = self.attachment_ids
+        if len(attachments) == 1:
+            result = attachments
+        else:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for attachment in attachments:
+                    archive.writestr(attachment.name, attachment.raw)
+            result = (
+                self.env["ir.attachment"]
+                .sudo()
+                .create(
+                    {
+                        "name": f"{self.name}.zip",
+                        "datas": base64.b64encode(buffer.getvalue()),
+                        "mimetype": "application/zip",
+                        "res_model": self._name,
+                        "res_id": self.id,
+                    }
+                )
+            )
+        self.write({"state": "done", "result_id": result.id})
+
+    def _process_chunk(self):
+        """
+        Render the next chunk of pending doctors; the job fails if one of
+        them cannot be rendered.
+        """
+        doctors = self.pending_doctor_ids[: self._chunk_size]
+        try:
+            with self.env.cr.savepoint():
+                attachments = self._copy_reports(self._render_reports(doctors))
+        except Exception as error:  # pylint: disable=broad-except
+            _logger.exception("Doctor report job %s failed", self.id)
+            self.write({"state": "failed", "error": str(error)})
+            return
+        self.write(
+            {
+                "attachment_ids": [(4, attachment.id) for attachment in attachments],
+                "pending_doctor_ids": [(3, doctor.id) for doctor in doctors],
+            }
+        )
+        if not self.pending_doctor_ids:
+            self._finish()
+
+    def action_start(self):
+        """
+        Serve at once the cached reports of the doctors and queue the others
+        for the scheduled action.
+
+        Returns:
+            dict: An action downloading the result when every report was
+            cached, or opening the job otherwise.
+        """
+        self.ensure_one()
+        fingerprints = self._get_fingerprints(self.doctor_ids)
+        cached = self._get_cached_reports(fingerprints)
+        previous = self.attachment_ids
+        self.write(
+            {
+                "state": "queued",
+                "error": False,
+                "attachment_ids": [(6, 0, self._copy_reports(cached.values()).ids)],
+                "pending_doctor_ids": [
+                    (6, 0, [doc.id for doc in self.doctor_ids if doc.id not in cached])
+                ],
+            }
+        )
+        previous.sudo().unlink()
+        if not self.pending_doctor_ids:
+            self._finish()
+            return self.action_download()
+        self.env.ref("hr_hospital.ir_cron_render_doctor_reports")._trigger()
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "current",
+        }
+
+    def action_download(self):
+        """
+        Download the result of the job.
+
+        Returns:
+            dict: An ir.actions.act_url downloading the reports.
+        """
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/web/content/{self.result_id.id}?download=true",
+            "target": "self",
+        }
+
+    @api.model
+    @profiled
+    def _cron_process(self):
+        """
+        Render the queued jobs chunk by chunk, oldest first, within the time
+        budget of a run.
+        """
+        deadline = time.monotonic() + self._time_budget
+        for job_id in self.search([("state", "=", "queued")], order="id").ids:
+            job = self.browse(job_id)
+            while job.state == "queued" and job.pending_doctor_ids:
+                if time.monotonic() > deadline:
+                    self.env.ref("hr_hospital.ir_cron_render_doctor_reports")._trigger()
+                    return
+                job._process_chunk()
+                self.env.flush_all()
+                if not odoo_module.current_test:
+                    self.env.cr.commit()
+                self.env.invalidate_all()
@@ -1 +1,7 @@
-from . import test_business, test_common, test_security
+from . import (
+    test_benchmark,
+    test_business,
+    test_common,
+    test_performance,
+    test_security,
+)
@@ -0,0 +1,261 @@
+"""
+Synthetic large-hospital data generator.
+
+Builds a reproducible dataset (specialties, a disease tree, doctors and interns,
+patients, visits and diagnoses) with bulk SQL inserts, so hundreds of doctors and
+a million visits can be seeded in seconds. Every stored column that the ORM
+would compute (names, planned day, access users, diagnosis related fields,
+doctor and patient counters, duplicate keys) is filled as well, so the seeded
+rows behave like records created through the ORM.
+
+Usage from a test or an Odoo shell::
+
+    from odoo.addons.hr_hospital.tests.data_generator import generate_hospital_data
+    stats = generate_hospital_data(env, doctors=300, visits=1_000_000)
+"""
+
+from datetime import datetime
+
+from psycopg2 import sql
+
+
+def generate_hospital_data(
+    env,
+    doctors=300,
+    patients=50000,
+    visits=1000000,
+    intern_ratio=0.2,
+    diagnosis_ratio=0.8,
+    start=datetime(2020, 1, 1),
+    days=5 * 365,
+    seed=42,
+):
+    """
+    Seed the hospital tables with a synthetic dataset.
+
+    Args:
+        env: Odoo environment used to run the inserts.
+        doctors (int): Number of doctors; `intern_ratio` of them are interns
+            with a randomly assigned mentor.
+        patients (int): Number of patients.
+        visits (int): Number of visits drawn over `days` days from `start`.
+            Past visits are done or cancelled, future ones are planned. Draws
+            repeating a doctor, patient and day are dropped, as the duplicate
+            visit check would reject them, so slightly fewer visits may be
+            seeded.
+        intern_ratio (float): Share of doctors that are interns.
+        diagnosis_ratio (float): Share of done visits that get a diagnosis.
+        start (datetime): First possible visit time.
+        days (int): Length of the visit period, in days.
+        seed (float|int): Seed of the PostgreSQL random generator, making the
+            dataset reproducible.
+
+    Returns:
+        dict: The ids of the seeded doctors and patients, and the number of
+        seeded visits and diagnoses.
+    """
+    cr = env.cr
+    cr.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+
+    specialties = env["hr.hospital.specialty"].create(
+        [{"name": f"Specialty {index}"} for index in range(20)]
+    )
+    categories = env["hr.hospital.disease"].create(
+        [{"name": f"Disease Category {index}"} for index in range(10)]
+    )
+    diseases = env["hr.hospital.disease"].create(
+        [
+            {"name": f"Disease {category.id}.{index}", "parent_id": category.id}
+            for category in categories
+            for index in range(10)
+        ]
+    )
+    env.flush_all()
+
+    cr.execute(
+        """
+        INSERT INTO hr_hospital_doctor (
+            first_name, last_name, name, specialty_id, is_intern
+        )
+        SELECT 'Doctor', 'No. ' || g, 'Doctor No. ' || g,
+               (%(specialties)s::int[])[(1 + floor(random() * %(specialty_count)s))::int],
+               g <= %(interns)s
+          FROM generate_series(1, %(doctors)s) g
+        RETURNING id, is_intern
+        """,
+        {
+            "specialties": specialties.ids,
+            "specialty_count": len(specialties),
+            "interns": int(doctors * intern_ratio),
+            "doctors": doctors,
+        },
+    )
+    rows = cr.fetchall()
+    doctor_ids = [doctor_id for doctor_id, _is_intern in rows]
+    mentor_ids = [doctor_id for doctor_id, is_intern in rows if not is_intern]
+    cr.execute(
+        """
+        UPDATE hr_hospital_doctor
+           SET mentor_id = (%(mentors)s::int[])[(1 + floor(random() * %(count)s))::int]
+         WHERE id IN %(doctors)s AND is_intern
+        """,
+        {
+            "mentors": mentor_ids,
+            "count": len(mentor_ids),
+            "doctors": tuple(doctor_ids),
+        },
+    )
+
+    cr.execute(
+        """
+        INSERT INTO hr_hospital_patient (
+            first_name, last_name, name, gender, phone, birth_date,
+            passport_data, personal_doctor_id
+        )
+        SELECT 'Patient', 'No. ' || g, 'Patient No. ' || g,
+               CASE WHEN g %% 2 = 0 THEN 'female' ELSE 'male' END,
+               '+380' || lpad((g * 7919 %% 1000000000)::text, 9, '0'),
+               DATE '1940-01-01' + floor(random() * 30000)::int,
+               'PP' || lpad(g::text, 8, '0'),
+               (%(doctors)s::int[])[(1 + floor(random() * %(doctor_count)s))::int]
+          FROM generate_series(1, %(patients)s) g
+        RETURNING id
+        """,
+        {
+            "doctors": doctor_ids,
+            "doctor_count": len(doctor_ids),
+            "patients": patients,
+        },
+    )
+    patient_ids = [row[0] for row in cr.fetchall()]
+    # Same keys as hr.hospital.patient._compute_duplicate_keys, for the plain
+    # ASCII names and single spaces of the seeded patients
+    cr.execute(
+        """
+        UPDATE hr_hospital_patient
+           SET age = date_part('year', age(birth_date)),
+               passport_key = upper(
+                   regexp_replace(passport_data, '[^[:alnum:]]+', '', 'g')
+               ),
+               identity_key = encode(
+                   sha256(convert_to(
+                       lower(name) || '|' || birth_date::text || '|'
+                       || right(regexp_replace(phone, '[^0-9]+', '', 'g'), 9),
+                       'UTF8'
+                   )),
+                   'hex'
+               )
+         WHERE id IN %s
+        """,
+        [tuple(patient_ids)],
+    )
+
+    cr.execute(
+        """
+        INSERT INTO hr_hospital_visit (
+            doctor_id, patient_id, planned_datetime, planned_date, status,
+            actual_datetime, visit_count, active
+        )
+        SELECT DISTINCT ON (doctor_id, patient_id, planned::date)
+               doctor_id, patient_id, planned, planned::date,
+               CASE WHEN planned > now() THEN 'planned'
+                    WHEN draw < 0.1 THEN 'cancelled'
+                    ELSE 'done' END,
+               CASE WHEN planned <= now() AND draw >= 0.1
+                    THEN planned + INTERVAL '10 minutes' END,
+               1, TRUE
+          FROM (
+            SELECT (%(doctors)s::int[])[(1 + floor(random() * %(doctor_count)s))::int]
+                       AS doctor_id,
+                   (%(patients)s::int[])[(1 + floor(random() * %(patient_count)s))::int]
+                       AS patient_id,
+                   %(start)s::timestamp
+                       + floor(random() * %(days)s) * INTERVAL '1 day'
+                       + (8 + floor(random() * 9)) * INTERVAL '1 hour'
+                       + floor(random() * 2) * INTERVAL '30 minutes' AS planned,
+                   random() AS draw
+              FROM generate_series(1, %(visits)s)
+          ) seed
+        """,
+        {
+            "doctors": doctor_ids,
+            "doctor_count": len(doctor_ids),
+            "patients": patient_ids,
+            "patient_count": len(patient_ids),
+            "start": start,
+            "days": days,
+            "visits": visits,
+        },
+    )
+    visit_count = cr.rowcount
+    cr.execute(
+        """
+        INSERT INTO hr_hospital_visit_access_user_rel (visit_id, user_id)
+        SELECT visit.id, access.user_id
+          FROM hr_hospital_visit visit
+          JOIN hr_hospital_doctor doctor ON doctor.id = visit.doctor_id
+          LEFT JOIN hr_hospital_doctor mentor ON mentor.id = doctor.mentor_id
+         CROSS JOIN LATERAL (VALUES (doctor.user_id), (mentor.user_id))
+               AS access (user_id)
+         WHERE visit.doctor_id IN %s
+           AND access.user_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """,
+        [tuple(doctor_ids)],
+    )
+
+    cr.execute(
+        """
+        INSERT INTO hr_hospital_diagnosis (
+            visit_id, disease_id, disease_category_id, description, approved,
+            patient_id_related, doctor_id, diagnosis_date, active
+        )
+        SELECT visit.id, disease.id, disease.parent_id, 'Synthetic diagnosis',
+               TRUE, visit.patient_id, visit.doctor_id, visit.actual_datetime, TRUE
+          FROM (
+            SELECT id, patient_id, doctor_id, actual_datetime,
+                   (%(diseases)s::int[])[(1 + floor(random() * %(disease_count)s))::int]
+                       AS disease_id
+              FROM hr_hospital_visit
+             WHERE doctor_id IN %(doctors)s
+               AND status = 'done'
+               AND random() < %(ratio)s
+          ) visit
+          JOIN hr_hospital_disease disease ON disease.id = visit.disease_id
+        """,
+        {
+            "diseases": diseases.ids,
+            "disease_count": len(diseases),
+            "doctors": tuple(doctor_ids),
+            "ratio": diagnosis_ratio,
+        },
+    )
+    diagnosis_count = cr.rowcount
+    cr.execute(
+        """
+        INSERT INTO hr_hospital_diagnosis_analysis_queue (day)
+        SELECT DISTINCT diagnosis_date::date
+          FROM hr_hospital_diagnosis
+         WHERE doctor_id IN %s
+        ON CONFLICT DO NOTHING
+        """,
+        [tuple(doctor_ids)],
+    )
+
+    env["hr.hospital.visit"]._rebuild_counters()
+
+    for table in (
+        "hr_hospital_doctor",
+        "hr_hospital_patient",
+        "hr_hospital_visit",
+        "hr_hospital_visit_access_user_rel",
+        "hr_hospital_diagnosis",
+    ):
+        cr.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table)))
+    env.invalidate_all()
+    return {
+        "doctor_ids": doctor_ids,
+        "patient_ids": patient_ids,
+        "visits": visit_count,
+        "diagnoses": diagnosis_count,
+    }
@@ -0,0 +1,287 @@
+import base64
+import json
+import logging
+import os
+import time
+
+from odoo.tests.common import tagged
+
+from .data_generator import generate_hospital_data
+from .test_common import HospitalCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("-standard", "-at_install", "post_install", "hr_hospital_benchmark")
+class TestBenchmark(HospitalCommon):
+    """
+    Benchmark suite of the HR Hospital hot paths on a large synthetic dataset.
+
+    Not part of the standard test run; execute it with
+    ``--test-tags hr_hospital_benchmark``. The dataset size is controlled by the
+    ``HR_HOSPITAL_BENCHMARK_DOCTORS``, ``HR_HOSPITAL_BENCHMARK_PATIENTS`` and
+    ``HR_HOSPITAL_BENCHMARK_VISITS`` environment variables. Wall time and query
+    count of every operation, and the size of the diagnosis table, are logged
+    at the end of the run, and written as JSON to
+    ``HR_HOSPITAL_BENCHMARK_OUTPUT`` when it is set.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Seed the synthetic dataset once for the whole suite.
+        """
+        super().setUpClass()
+        start = time.perf_counter()
+        cls.stats = generate_hospital_data(
+            cls.env,
+            doctors=int(os.environ.get("HR_HOSPITAL_BENCHMARK_DOCTORS", 300)),
+            patients=int(os.environ.get("HR_HOSPITAL_BENCHMARK_PATIENTS", 50000)),
+            visits=int(os.environ.get("HR_HOSPITAL_BENCHMARK_VISITS", 1000000)),
+        )
+        _logger.info(
+            "Seeded %s visits and %s diagnoses in %.1f s",
+            cls.stats["visits"],
+            cls.stats["diagnoses"],
+            time.perf_counter() - start,
+        )
+        cls.results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Log the benchmark results and write them to the output file, if any.
+        """
+        for name, result in sorted(cls.results.items()):
+            if "bytes" in result:
+                _logger.info("%-40s %10.1f MB", name, result["bytes"] / 1024 / 1024)
+                continue
+            _logger.info(
+                "%-40s %10.1f ms %8d queries",
+                name,
+                result["ms"],
+                result["queries"],
+            )
+        output = os.environ.get("HR_HOSPITAL_BENCHMARK_OUTPUT")
+        if output:
+            with open(output, "w", encoding="utf-8") as file:
+                json.dump(cls.results, file, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    def _benchmark(self, name, func):
+        """
+        Run `func` on a cold cache, record its wall time and query count.
+
+        Returns:
+            The value returned by `func`.
+        """
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        result = func()
+        self.env.flush_all()
+        self.results[name] = {
+            "ms": (time.perf_counter() - start) * 1000,
+            "queries": self.env.cr.sql_log_count - queries,
+        }
+        return result
+
+    def test_visit_constraints(self):
+        """
+        Benchmark the visit constraints on a batch of new planned visits.
+        """
+        patients = self.env["hr.hospital.patient"].create(
+            [
+                {"first_name": "Benchmark", "last_name": f"Patient {index}"}
+                for index in range(1000)
+            ]
+        )
+        doctor_ids = self.stats["doctor_ids"]
+        visits = self._benchmark(
+            "visit constraints (1000 creates)",
+            lambda: self.env["hr.hospital.visit"].create(
+                [
+                    {
+                        "doctor_id": doctor_ids[index % len(doctor_ids)],
+                        "patient_id": patient.id,
+                        "planned_datetime": "2030-01-01 10:00:00",
+                    }
+                    for index, patient in enumerate(patients)
+                ]
+            ),
+        )
+        self.assertEqual(len(visits), 1000)
+
+    def test_patient_diagnosis_history(self):
+        """
+        Benchmark reading the diagnosis history of a page of patients.
+        """
+        patients = self.env["hr.hospital.patient"].browse(
+            self.stats["patient_ids"][:500]
+        )
+        self._benchmark(
+            "patient diagnosis history (500 patients)",
+            lambda: patients.read(["diagnosis_ids"]),
+        )
+
+    def test_doctor_report(self):
+        """
+        Benchmark rendering the doctor report of a batch of doctors.
+        """
+        doctor_ids = self.stats["doctor_ids"][:10]
+        html, _report_type = self._benchmark(
+            "doctor report (10 doctors)",
+            lambda: self.env["ir.actions.report"]._render_qweb_html(
+                "hr_hospital.action_doctor_report", doctor_ids
+            ),
+        )
+        self.assertTrue(html)
+
+    def test_patient_doctor_update_wizard(self):
+        """
+        Benchmark handing over every patient of a doctor to another doctor.
+        """
+        doctor_ids = self.stats["doctor_ids"]
+        wiz = self.env["hr.hospital.patient.doctor.wizard"].create(
+            {
+                "mode": "doctor",
+                "source_doctor_id": doctor_ids[0],
+                "doctor_id": doctor_ids[1],
+            }
+        )
+        self._benchmark("patient doctor wizard (by doctor)", wiz.action_update_doctor)
+
+    def test_diagnosis_report_wizard(self):
+        """
+        Benchmark the diagnosis report wizard and the analysis refresh.
+        """
+        diagnoses = self.env["hr.hospital.diagnosis"]
+        wiz = self.env["hr.hospital.diagnosis.report.wizard"].create(
+            {
+                "doctor_ids": [(6, 0, self.stats["doctor_ids"][:20])],
+                "date_from": "2021-01-01",
+                "date_to": "2021-12-31",
+            }
+        )
+        self._benchmark(
+            "diagnosis wizard (filtered list)",
+            lambda: diagnoses.search(wiz.get_diagnosis_records()["domain"], limit=80),
+        )
+        analysis = self.env["hr.hospital.diagnosis.analysis"]
+        self._benchmark("diagnosis analysis (full refresh)", analysis._refresh)
+        self._benchmark("diagnosis analysis (incremental refresh)", analysis._refresh)
+        self._benchmark(
+            "diagnosis analysis (filtered pivot)",
+            lambda: analysis.read_group(
+                wiz.get_diagnosis_analysis()["domain"],
+                ["diagnosis_count:sum"],
+                ["disease_id"],
+            ),
+        )
+
+    def test_pivots(self):
+        """
+        Benchmark the pivot groupings of visits and diagnoses.
+        """
+        self.env["hr.hospital.diagnosis.analysis"]._refresh()
+        self._benchmark(
+            "visit pivot (doctor x status)",
+            lambda: self.env["hr.hospital.visit"].read_group(
+                [], ["visit_count:sum"], ["doctor_id", "status"], lazy=False
+            ),
+        )
+        self._benchmark(
+            "diagnosis pivot (disease x month)",
+            lambda: self.env["hr.hospital.diagnosis"].read_group(
+                [], [], ["disease_id", "diagnosis_date:month"], lazy=False
+            ),
+        )
+        self._benchmark(
+            "diagnosis analysis pivot (disease x month)",
+            lambda: self.env["hr.hospital.diagnosis.analysis"].read_group(
+                [],
+                ["diagnosis_count:sum"],
+                ["disease_id", "date:month"],
+                lazy=False,
+            ),
+        )
+
+    def test_doctor_form_view(self):
+        """
+        Benchmark loading the doctor form view, uncached then from the view cache.
+        """
+        Doctor = self.env["hr.hospital.doctor"]
+        self.env.registry.clear_all_caches()
+        self._benchmark(
+            "doctor form view (uncached)",
+            lambda: Doctor.get_view(view_type="form"),
+        )
+        self._benchmark(
+            "doctor form view (cached)",
+            lambda: Doctor.get_view(view_type="form"),
+        )
+
+    def test_import_visits(self):
+        """
+        Benchmark the streaming import of visits from a CSV file.
+        """
+        doctor_ids = self.stats["doctor_ids"]
+        patient_ids = self.stats["patient_ids"][:20000]
+        lines = ["doctor_id,patient_id,planned_datetime,actual_datetime,status"]
+        lines += [
+            f"{doctor_ids[index % len(doctor_ids)]},{patient_id},"
+            f"2019-06-01 10:00:00,2019-06-01 10:10:00,done"
+            for index, patient_id in enumerate(patient_ids)
+        ]
+        action = (
+            self.env["hr.hospital.import.wizard"]
+            .create(
+                {
+                    "res_model": "hr.hospital.visit",
+                    "file": base64.b64encode("\n".join(lines).encode()),
+                    "filename": "visits.csv",
+                }
+            )
+            .action_import()
+        )
+        Job = self.env["hr.hospital.import.job"]
+        self._benchmark(f"import visits ({len(patient_ids)} rows)", Job._cron_process)
+        self.assertEqual(Job.browse(action["res_id"]).imported_rows, len(patient_ids))
+
+    def test_export_diagnoses(self):
+        """
+        Benchmark the streaming CSV export of the diagnoses of a year.
+        """
+        domain = [
+            ("diagnosis_date", ">=", "2021-01-01"),
+            ("diagnosis_date", "<", "2022-01-01"),
+        ]
+        exporter = self.env["hr.hospital.export"]
+        size = self._benchmark(
+            "export diagnoses (one year, csv)",
+            lambda: sum(len(chunk) for chunk in exporter.iter_csv("diagnosis", domain)),
+        )
+        self.assertTrue(size)
+
+    def test_diagnosis_cascade(self):
+        """
+        Benchmark visit writes cascading to diagnoses, and log the size of the
+        diagnosis table.
+        """
+        self.env.cr.execute("SELECT pg_total_relation_size('hr_hospital_diagnosis')")
+        self.results["diagnosis table size"] = {"bytes": self.env.cr.fetchone()[0]}
+        visits = (
+            self.env["hr.hospital.diagnosis"]
+            .search([("doctor_id", "in", self.stats["doctor_ids"])], limit=1000)
+            .visit_id
+        )
+        self._benchmark(
+            "visit notes write (1000 diagnosed visits)",
+            lambda: visits.write({"notes": "Benchmark notes " * 20}),
+        )
+        self._benchmark(
+            "visit doctor change (1000 diagnosed visits)",
+            lambda: visits.with_context(no_check_edit=True).write(
+                {"doctor_id": self.stats["doctor_ids"][-1]}
+            ),
+        )
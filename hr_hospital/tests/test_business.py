@@ -1,8 +1,16 @@
-from datetime import datetime, timedelta
+import base64
+import io
+import json
+import zipfile
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
 
-from odoo.exceptions import ValidationError
-from odoo.tests.common import tagged
+from lxml import etree
+from odoo.exceptions import AccessError, ValidationError
+from odoo.tests.common import new_test_user, tagged
+from PIL import Image
 
+from ..models import availability as availability_module
 from .test_common import HospitalCommon
 
 
@@ -32,6 +40,34 @@ class TestBusinessLogic(HospitalCommon):
         self.patient._compute_age()
         self.assertGreater(self.patient.age, 20)
 
+    def test_patient_age_cron(self):
+        """
+        Test that the nightly job refreshes the age of patients whose birthday
+        occurred since the last run, and only theirs.
+        """
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+        birthday_patient = self.env["hr.hospital.patient"].create(
+            {
+                "first_name": "Birthday",
+                "last_name": "Patient",
+                "birth_date": today.replace(year=1992),
+            }
+        )
+        self.patient.birth_date = (today - timedelta(days=2)).replace(year=1992)
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE hr_hospital_patient SET age = 0 WHERE id IN %s",
+            [(birthday_patient.id, self.patient.id)],
+        )
+        self.env.invalidate_all()
+        self.env["ir.config_parameter"].sudo().set_param(
+            "hr_hospital.age_last_run", str(yesterday)
+        )
+        self.env["hr.hospital.patient"]._cron_update_age()
+        self.assertEqual(birthday_patient.age, today.year - 1992)
+        self.assertEqual(self.patient.age, 0)
+
     def test_duplicate_visit(self):
         """
         Ensure that a doctor cannot have two visits with the same patient
@@ -47,6 +83,37 @@ class TestBusinessLogic(HospitalCommon):
                 }
             )
 
+    def test_duplicate_visit_batch(self):
+        """
+        Ensure that duplicates inside a single batch are detected as well,
+        and that visits without a planned date are accepted.
+        """
+        other = self.env["hr.hospital.patient"].create(
+            {"first_name": "Batch", "last_name": "Patient"}
+        )
+        self.env["hr.hospital.visit"].create(
+            [
+                {"doctor_id": self.doctor.id, "patient_id": other.id},
+                {"doctor_id": self.doctor.id, "patient_id": other.id},
+            ]
+        )
+        planned = datetime.now() + timedelta(days=3)
+        with self.assertRaises(ValidationError):
+            self.env["hr.hospital.visit"].create(
+                [
+                    {
+                        "doctor_id": self.doctor.id,
+                        "patient_id": other.id,
+                        "planned_datetime": planned,
+                    },
+                    {
+                        "doctor_id": self.doctor.id,
+                        "patient_id": other.id,
+                        "planned_datetime": planned + timedelta(hours=1),
+                    },
+                ]
+            )
+
     def test_done_visit_write(self):
         """
         Ensure that once a visit is marked 'done', no updates are allowed
@@ -85,6 +152,29 @@ class TestBusinessLogic(HospitalCommon):
         with self.assertRaises(ValidationError):
             self.visit.unlink()
 
+    def test_unlink_visits_in_bulk(self):
+        """
+        Test that visits without diagnoses are deleted in bulk, and that the
+        error names the visits that block the deletion.
+        """
+        self.env["hr.hospital.diagnosis"].create(
+            {
+                "visit_id": self.visit.id,
+                "disease_id": self.disease.id,
+                "approved": True,
+            }
+        )
+        visits = self.env["hr.hospital.visit"].create(
+            [
+                {"doctor_id": self.doctor.id, "patient_id": self.patient.id}
+                for _index in range(3)
+            ]
+        )
+        with self.assertRaisesRegex(ValidationError, "John Patient"):
+            (visits | self.visit).unlink()
+        visits.unlink()
+        self.assertFalse(visits.exists())
+
     def test_patient_doctor_update_wizard(self):
         """
         Test that the patient-doctor wizard correctly assigns
@@ -99,10 +189,34 @@ class TestBusinessLogic(HospitalCommon):
         wiz.action_update_doctor()
         self.assertEqual(self.patient.personal_doctor_id.id, self.doctor.id)
 
+    def test_patient_doctor_update_wizard_by_doctor(self):
+        """
+        Test that the wizard reassigns every patient of the current personal
+        doctor when used in "by doctor" mode.
+        """
+        other = self.env["hr.hospital.patient"].create(
+            {
+                "first_name": "Jane",
+                "last_name": "Patient",
+                "personal_doctor_id": self.doctor.id,
+            }
+        )
+        wiz = self.env["hr.hospital.patient.doctor.wizard"].create(
+            {
+                "mode": "doctor",
+                "doctor_id": self.intern.id,
+                "source_doctor_id": self.doctor.id,
+            }
+        )
+        wiz.action_update_doctor()
+        self.assertEqual(self.patient.personal_doctor_id, self.intern)
+        self.assertEqual(other.personal_doctor_id, self.intern)
+
     def test_diagnosis_report_wizard_domain(self):
         """
         Test that the diagnosis report wizard builds the expected domain
-        based on selected doctors, diseases, and dates.
+        based on selected doctors, diseases, and dates, and reads its
+        statistics from the analysis.
         """
         wiz = self.env["hr.hospital.diagnosis.report.wizard"].create(
             {
@@ -114,3 +228,692 @@ class TestBusinessLogic(HospitalCommon):
         action = wiz.get_diagnosis_records()
         self.assertIn(("visit_id.doctor_id", "in", [self.intern.id]), action["domain"])
         self.assertIn(("disease_id", "in", [self.disease.id]), action["domain"])
+        self.assertNotIn("pivot", action["view_mode"])
+
+        action = wiz.get_diagnosis_analysis()
+        self.assertEqual(action["res_model"], "hr.hospital.diagnosis.analysis")
+        self.assertIn(("doctor_id", "in", [self.intern.id]), action["domain"])
+
+    def test_doctor_report_latest_visits(self):
+        """
+        Test that the doctor report lists the most recent visit of each patient,
+        regardless of the order in which visits were created.
+        """
+        now = datetime.now()
+        latest = self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": now + timedelta(days=10),
+            }
+        )
+        self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": now + timedelta(days=5),
+            }
+        )
+        report = self.env["report.hr_hospital.report_doctor_template"]
+        values = report._get_report_values(self.doctor.ids)
+        self.assertEqual(values["get_latest_visits"](self.doctor), latest)
+        visits = values["get_visits"](self.doctor)
+        self.assertEqual(visits[0], latest)
+        self.assertEqual(len(visits), 2)
+        self.assertEqual(values["get_hidden_visit_count"](self.doctor), 0)
+
+        other = self.env["hr.hospital.patient"].create(
+            {"first_name": "Adam", "last_name": "First"}
+        )
+        first = self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": other.id,
+                "planned_datetime": now + timedelta(days=1),
+            }
+        )
+        values = report._get_report_values(self.doctor.ids, {"visit_limit": 1})
+        self.assertEqual(
+            values["get_latest_visits"](self.doctor).ids, [first.id, latest.id]
+        )
+        self.assertEqual(len(values["get_visits"](self.doctor)), 1)
+        self.assertEqual(values["get_hidden_visit_count"](self.doctor), 2)
+
+    def test_disease_subtree_reporting(self):
+        """
+        Test that diagnoses roll up to the top-level disease and that
+        the report wizard can filter on a whole disease subtree.
+        """
+        infections = self.env["hr.hospital.disease"].create({"name": "Infections"})
+        viral = self.env["hr.hospital.disease"].create(
+            {"name": "Viral Infection", "parent_id": infections.id}
+        )
+        self.disease.parent_id = viral
+        diagnosis = self.env["hr.hospital.diagnosis"].create(
+            {
+                "visit_id": self.visit.id,
+                "disease_id": self.disease.id,
+                "approved": True,
+            }
+        )
+        self.assertEqual(diagnosis.disease_category_id, infections)
+        self.assertEqual(infections.diagnosis_count, 1)
+        self.assertEqual(viral.diagnosis_count, 1)
+
+        wiz = self.env["hr.hospital.diagnosis.report.wizard"].create(
+            {
+                "disease_ids": [(6, 0, [infections.id])],
+                "include_sub_diseases": True,
+            }
+        )
+        action = wiz.get_diagnosis_records()
+        self.assertIn(
+            diagnosis, self.env["hr.hospital.diagnosis"].search(action["domain"])
+        )
+
+    def test_diagnosis_analysis_refresh(self):
+        """
+        Test that the diagnosis analysis is refreshed incrementally
+        on diagnosis creation and deletion.
+        """
+        self.visit.actual_datetime = datetime(2025, 1, 15, 10, 0)
+        diagnosis = self.env["hr.hospital.diagnosis"].create(
+            {
+                "visit_id": self.visit.id,
+                "disease_id": self.disease.id,
+                "approved": True,
+            }
+        )
+        analysis = self.env["hr.hospital.diagnosis.analysis"]
+        domain = [
+            ("date", "=", date(2025, 1, 15)),
+            ("disease_id", "=", self.disease.id),
+        ]
+        analysis._refresh()
+        rows = analysis.search(domain)
+        self.assertEqual(sum(rows.mapped("diagnosis_count")), 1)
+        self.assertTrue(all(rows.mapped("is_intern")))
+
+        diagnosis.unlink()
+        analysis._refresh()
+        self.assertFalse(analysis.search(domain))
+
+    def test_profiling_stats(self):
+        """
+        Test that profiled methods are recorded once profiling is enabled.
+        """
+        profiler = self.env["hr.hospital.profiler"]
+        profiler.reset_stats()
+        self.env["ir.config_parameter"].sudo().set_param("hr_hospital.profiling", "1")
+        report = self.env["report.hr_hospital.report_doctor_template"]
+        report._get_report_values(self.doctor.ids)
+        stats = {row["method"]: row for row in profiler.get_stats()}
+        entry = stats["report.hr_hospital.report_doctor_template._get_report_values"]
+        self.assertEqual(entry["calls"], 1)
+        profiler.reset_stats()
+        self.assertFalse(profiler.get_stats())
+
+    def test_doctor_free_slots(self):
+        """
+        Test that planned visits occupy their slot, and that the cached slots
+        are refreshed when a visit is cancelled or committed by another
+        transaction.
+        """
+        availability = self.env["hr.hospital.availability"]
+        self.env.user.tz = "UTC"
+        day = date.today() + timedelta(days=7)
+        slot = datetime.combine(day, datetime.min.time()).replace(hour=10)
+        visit = self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": slot + timedelta(minutes=10),
+            }
+        )
+        slots = availability.get_free_slots(day, day, doctor_ids=self.doctor.ids)
+        free = slots[self.doctor.id]
+        self.assertEqual(len(free), 17)
+        self.assertNotIn(slot, free)
+        self.assertIn(slot + timedelta(minutes=30), free)
+
+        visit.status = "cancelled"
+        slots = availability.get_free_slots(day, day, doctor_ids=self.doctor.ids)
+        self.assertIn(slot, slots[self.doctor.id])
+
+        # Slots computed while a doctor's visits are uncommitted are not
+        # cached; once committed, the fingerprint reveals the change
+        other = self.env["hr.hospital.doctor"].create(
+            {"first_name": "Carol", "last_name": "Other"}
+        )
+        availability.get_free_slots(day, day, doctor_ids=other.ids)
+        key = (self.env.cr.dbname, other.id)
+        fingerprint = availability_module._slot_cache[key][0]
+        self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": other.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": slot,
+            }
+        )
+        slots = availability.get_free_slots(day, day, doctor_ids=other.ids)
+        self.assertNotIn(slot, slots[other.id])
+        self.assertEqual(availability_module._slot_cache[key][0], fingerprint)
+        self.env.cr.postcommit.data.pop(availability_module._DIRTY_KEY)
+        slots = availability.get_free_slots(day, day, doctor_ids=other.ids)
+        self.assertNotIn(slot, slots[other.id])
+        self.assertNotEqual(availability_module._slot_cache[key][0], fingerprint)
+
+        action = self.doctor.action_record_patient()
+        self.assertEqual(action["context"]["default_doctor_id"], self.doctor.id)
+        self.assertTrue(action["context"]["default_planned_datetime"])
+
+    def test_visit_calendar_feed(self):
+        """
+        Test that the calendar feed returns the visits of the window with their
+        names, and that its ETag changes only when the window changes.
+        """
+        Visit = self.env["hr.hospital.visit"]
+        start = datetime.combine(date.today() + timedelta(days=30), datetime.min.time())
+        stop = start + timedelta(days=7)
+        visit = Visit.create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": start + timedelta(days=1, hours=9),
+            }
+        )
+
+        visits = Visit._search_calendar(start, stop, [self.doctor.id])
+        self.assertEqual(visits, visit)
+        etag = Visit._get_calendar_etag(start, stop, [self.doctor.id])
+        events = visits._read_calendar()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["doctor_id"], [self.doctor.id, self.doctor.name])
+        self.assertEqual(events[0]["patient_id"], [self.patient.id, self.patient.name])
+        self.assertEqual(Visit._get_calendar_etag(start, stop, [self.doctor.id]), etag)
+
+        # write dates are per transaction: simulate a later rename
+        self.patient.last_name = "Renamed"
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE hr_hospital_patient SET write_date = write_date + interval '1s'"
+            " WHERE id = %s",
+            [self.patient.id],
+        )
+        renamed_etag = Visit._get_calendar_etag(start, stop, [self.doctor.id])
+        self.assertNotEqual(renamed_etag, etag)
+
+        visit.planned_datetime = stop + timedelta(hours=1)
+        visits = Visit._search_calendar(start, stop, [self.doctor.id])
+        self.assertFalse(visits)
+        self.assertNotEqual(
+            Visit._get_calendar_etag(start, stop, [self.doctor.id]), renamed_etag
+        )
+        self.assertEqual(visits._read_calendar(), [])
+
+    def test_doctor_patient_counters(self):
+        """
+        Test that the counters maintained by deltas match a full recount
+        through visit creation, status and doctor changes, intern flag
+        changes, archiving and deletion.
+        """
+        Visit = self.env["hr.hospital.visit"]
+        doctors = self.doctor | self.intern
+        counters = Visit._doctor_counters
+
+        def snapshot():
+            return (
+                doctors.read(counters),
+                self.patient.read(Visit._patient_counters),
+            )
+
+        now = datetime.now().replace(microsecond=0)
+        planned = Visit.create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": now + timedelta(days=3),
+            }
+        )
+        done = Visit.with_context(no_check_edit=True).create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": now - timedelta(days=3),
+                "actual_datetime": now - timedelta(days=3),
+                "status": "done",
+            }
+        )
+        self.assertEqual(self.doctor.visit_planned_count, 1)
+        self.assertEqual(self.doctor.visit_done_count, 1)
+        self.assertEqual(self.doctor.patient_count, 1)
+        self.assertEqual(self.doctor.last_visit_date, done.actual_datetime.date())
+        self.assertEqual(self.patient.last_visit_date, done.actual_datetime.date())
+
+        planned.status = "cancelled"
+        self.assertEqual(self.doctor.visit_planned_count, 0)
+        self.assertEqual(self.doctor.visit_cancelled_count, 1)
+
+        planned.doctor_id = self.intern
+        self.assertEqual(self.doctor.visit_cancelled_count, 0)
+        self.assertEqual(self.doctor.patient_count, 1)
+        self.assertEqual(self.intern.visit_cancelled_count, 1)
+
+        self.env["hr.hospital.diagnosis"].create(
+            {
+                "visit_id": done.id,
+                "disease_id": self.disease.id,
+                "approved": False,
+            }
+        )
+        # only diagnoses of interns wait for approval
+        self.assertEqual(self.doctor.pending_diagnosis_count, 0)
+        self.assertEqual(self.patient.pending_diagnosis_count, 0)
+
+        done.with_context(no_check_edit=True).doctor_id = self.intern
+        self.assertEqual(self.doctor.visit_done_count, 0)
+        self.assertEqual(self.doctor.patient_count, 0)
+        self.assertFalse(self.doctor.last_visit_date)
+        self.assertEqual(self.intern.pending_diagnosis_count, 1)
+        self.assertEqual(self.patient.pending_diagnosis_count, 1)
+
+        self.intern.is_intern = False
+        self.assertEqual(self.intern.pending_diagnosis_count, 0)
+        self.assertEqual(self.patient.pending_diagnosis_count, 0)
+        self.intern.is_intern = True
+        self.assertEqual(self.intern.pending_diagnosis_count, 1)
+
+        done.action_archive()
+        self.assertEqual(self.intern.pending_diagnosis_count, 0)
+        self.assertEqual(self.intern.visit_done_count, 1)
+        done.action_unarchive()
+        self.assertEqual(self.intern.pending_diagnosis_count, 1)
+
+        incremental = snapshot()
+        Visit._rebuild_counters()
+        self.assertEqual(snapshot(), incremental)
+
+        done.diagnosis_ids.unlink()
+        done.unlink()
+        self.assertEqual(self.intern.visit_done_count, 0)
+        self.assertEqual(self.intern.pending_diagnosis_count, 0)
+        self.assertEqual(self.patient.pending_diagnosis_count, 0)
+
+        incremental = snapshot()
+        Visit._rebuild_counters()
+        self.assertEqual(snapshot(), incremental)
+
+    def test_doctor_form_mentor_visibility(self):
+        """
+        Test that the doctor form hides the mentor of non-interns, and that
+        the processed arch is served from the view cache afterwards.
+        """
+        Doctor = self.env["hr.hospital.doctor"]
+        arch = Doctor.get_view(view_type="form")["arch"]
+        [mentor] = etree.fromstring(arch).xpath("//field[@name='mentor_id']")
+        self.assertEqual(mentor.get("invisible"), "not is_intern")
+
+        with patch.object(
+            type(Doctor), "_get_view", side_effect=AssertionError("arch reprocessed")
+        ):
+            self.assertEqual(Doctor.get_view(view_type="form")["arch"], arch)
+
+    def test_import_wizard(self):
+        """
+        Test the queued streaming import: rows are created in chunks, rejected
+        rows are reported without blocking their chunk, and a job resumes
+        after its checkpoint.
+        """
+        day = date.today() + timedelta(days=40)
+        rows = [
+            "doctor_id,patient_id,planned_datetime,status",
+            f"{self.doctor.id},{self.patient.name},{day} 09:00:00,planned",
+            f"{self.doctor.name},{self.patient.id},{day} 10:00:00,planned",
+            f"{self.doctor.id},Nobody,{day} 11:00:00,planned",
+            f"{self.doctor.id},{self.patient.id},{day} 12:00:00,unknown",
+            f"{self.intern.id},{self.patient.id},{day} 09:00:00,planned",
+        ]
+        Job = self.env["hr.hospital.import.job"]
+        action = (
+            self.env["hr.hospital.import.wizard"]
+            .create(
+                {
+                    "res_model": "hr.hospital.visit",
+                    "file": base64.b64encode("\n".join(rows).encode()),
+                    "filename": "visits.csv",
+                    "chunk_size": 2,
+                }
+            )
+            .action_import()
+        )
+        job = Job.browse(action["res_id"])
+        self.assertEqual(job.state, "queued")
+        self.assertEqual(job.attachment_id.res_id, job.id)
+        Job._cron_process()
+
+        visits = self.env["hr.hospital.visit"].search(
+            [("planned_date", "=", day), ("patient_id", "=", self.patient.id)]
+        )
+        self.assertEqual(len(visits), 2)
+        self.assertEqual(visits.doctor_id, self.doctor | self.intern)
+        self.assertEqual(job.state, "done")
+        self.assertEqual(
+            (job.processed_rows, job.imported_rows, job.error_rows), (5, 2, 3)
+        )
+        report = base64.b64decode(job.error_report_id.datas).decode().splitlines()
+        self.assertEqual(
+            [line.split(",")[0] for line in report], ["row", "2", "3", "4"]
+        )
+
+        lines = [
+            {"first_name": "Skipped", "last_name": "Row"},
+            {"first_name": "Imported", "last_name": "Row"},
+        ]
+        action = (
+            self.env["hr.hospital.import.wizard"]
+            .create(
+                {
+                    "res_model": "hr.hospital.patient",
+                    "file": base64.b64encode(
+                        "\n".join(json.dumps(line) for line in lines).encode()
+                    ),
+                    "filename": "patients.jsonl",
+                }
+            )
+            .action_import()
+        )
+        resumed = Job.browse(action["res_id"])
+        resumed.processed_rows = 1
+        Job._cron_process()
+        self.assertEqual(resumed.imported_rows, 1)
+        patients = self.env["hr.hospital.patient"].search([("last_name", "=", "Row")])
+        self.assertEqual(patients.mapped("first_name"), ["Imported"])
+
+        action = (
+            self.env["hr.hospital.import.wizard"]
+            .create(
+                {
+                    "res_model": "hr.hospital.patient",
+                    "file": base64.b64encode(b'{"first_name": "Broken'),
+                    "filename": "broken.jsonl",
+                }
+            )
+            .action_import()
+        )
+        Job._cron_process()
+        self.assertEqual(Job.browse(action["res_id"]).state, "failed")
+
+    def test_streaming_export(self):
+        """
+        Test that the exports walk all matching records by chunks and join
+        the related names.
+        """
+        exporter = self.env["hr.hospital.export"]
+        self.patch(type(exporter), "_chunk_size", 1)
+        self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": datetime.now() + timedelta(days=50),
+            }
+        )
+        domain = [("patient_id", "=", self.patient.id)]
+        chunks = list(exporter._iter_chunks("visit", domain))
+        self.assertEqual(len(chunks), 2)
+
+        lines = b"".join(exporter.iter_csv("visit", domain)).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(self.patient.name, lines[1])
+        self.assertIn(self.intern.name, lines[1])
+        self.assertIn(self.doctor.name, lines[2])
+
+        action = self.patient.action_export_visits()
+        self.assertTrue(action["url"].startswith("/hr_hospital/export/visit?"))
+
+    def test_diagnosis_follows_visit(self):
+        """
+        Test that diagnoses read the visit notes through the visit, and follow
+        changes of the visit's doctor, patient and time.
+        """
+        diagnosis = self.env["hr.hospital.diagnosis"].create(
+            {"visit_id": self.visit.id, "disease_id": self.disease.id, "approved": True}
+        )
+        self.assertEqual(diagnosis.doctor_id, self.intern)
+        self.assertEqual(diagnosis.patient_id_related, self.patient)
+        self.assertFalse(diagnosis._fields["notes"].store)
+
+        actual = datetime.now().replace(microsecond=0)
+        self.visit.write(
+            {"doctor_id": self.doctor.id, "actual_datetime": actual, "notes": "Fever"}
+        )
+        self.assertEqual(diagnosis.doctor_id, self.doctor)
+        self.assertEqual(diagnosis.diagnosis_date, actual)
+        self.assertEqual(diagnosis.notes, "Fever")
+        self.assertEqual(
+            self.env["hr.hospital.diagnosis"].search(
+                [("id", "=", diagnosis.id), ("doctor_id", "=", self.doctor.id)]
+            ),
+            diagnosis,
+        )
+
+    def test_person_photo_variants(self):
+        """
+        Test that photos are bounded to 1024 px and resized once to the
+        variants shown by the views.
+        """
+        output = io.BytesIO()
+        Image.new("RGB", (2000, 1500), "blue").save(output, format="PNG")
+        self.patient.photo = base64.b64encode(output.getvalue())
+
+        for field, size in (("photo", 1024), ("photo_256", 256), ("photo_128", 128)):
+            image = Image.open(io.BytesIO(base64.b64decode(self.patient[field])))
+            self.assertEqual(max(image.size), size, field)
+
+    def test_patient_quick_search(self):
+        """
+        Test that patients are found by partial name, phone or passport.
+        """
+        self.patient.write({"phone": "+380501234567", "passport_data": "KX123456"})
+        patients = self.env["hr.hospital.patient"]
+        for term in ("ohn Pat", "0501234", "x1234"):
+            with self.subTest(term=term):
+                found = [record_id for record_id, _name in patients.name_search(term)]
+                self.assertIn(self.patient.id, found)
+
+    def test_duplicate_patients(self):
+        """
+        Test that patients differing only by formatting share their keys, are
+        reported on creation, and are clustered by the duplicate job.
+        """
+        Patient = self.env["hr.hospital.patient"]
+        self.patient.write(
+            {
+                "birth_date": "1980-05-17",
+                "phone": "+380 50 123 45 67",
+                "passport_data": "KX 123456",
+            }
+        )
+        same_passport = Patient.create(
+            {"first_name": "Jon", "last_name": "Patiente", "passport_data": "kx-123456"}
+        )
+        same_identity = Patient.create(
+            {
+                "first_name": "  JOHN ",
+                "last_name": "patient",
+                "birth_date": "1980-05-17",
+                "phone": "050-123-45-67",
+            }
+        )
+        self.assertEqual(same_passport.passport_key, self.patient.passport_key)
+        self.assertEqual(same_identity.identity_key, self.patient.identity_key)
+
+        new = Patient.new(
+            {"first_name": "Other", "last_name": "Person", "passport_data": "KX123456"}
+        )
+        warning = new._onchange_duplicate_keys()
+        self.assertIn(self.patient.name, warning["warning"]["message"])
+
+        duplicates = self.env["hr.hospital.patient.duplicate"]
+        duplicates._cron_find_duplicates()
+        cluster = duplicates.search([("patient_ids", "in", self.patient.id)])
+        self.assertEqual(
+            cluster.patient_ids, self.patient | same_passport | same_identity
+        )
+        self.assertEqual(cluster.match, "both")
+
+    def test_archive_old_visits(self):
+        """
+        Test that old done visits are archived with their diagnoses, left out
+        of searches, and still read through the patient history.
+        """
+        Visit = self.env["hr.hospital.visit"].with_context(no_check_edit=True)
+        now = datetime.now().replace(microsecond=0)
+        old, recent = Visit.create(
+            [
+                {
+                    "doctor_id": self.doctor.id,
+                    "patient_id": self.patient.id,
+                    "planned_datetime": now - timedelta(days=40),
+                    "actual_datetime": now - timedelta(days=40),
+                    "status": "done",
+                },
+                {
+                    "doctor_id": self.doctor.id,
+                    "patient_id": self.patient.id,
+                    "planned_datetime": now - timedelta(days=5),
+                    "actual_datetime": now - timedelta(days=5),
+                    "status": "done",
+                },
+            ]
+        )
+        diagnosis = self.env["hr.hospital.diagnosis"].create(
+            {"visit_id": old.id, "disease_id": self.disease.id}
+        )
+        self.env["ir.config_parameter"].set_param("hr_hospital.archive_after_days", 30)
+
+        self.assertEqual(Visit._cron_archive(), 1)
+        self.assertFalse(old.active)
+        self.assertTrue(recent.active)
+        self.assertFalse(diagnosis.active)
+        self.assertEqual(old.diagnosis_ids, diagnosis)
+        self.assertEqual(self.doctor.visit_done_count, 2)
+
+        patient_visits = [("patient_id", "=", self.patient.id)]
+        self.assertNotIn(old, Visit.search(patient_visits))
+        history = self.patient.action_open_history()
+        self.assertIn(
+            old,
+            Visit.with_context(**history["context"]).search(history["domain"]),
+        )
+        with self.assertRaises(ValidationError):
+            old.unlink()
+
+        old.action_unarchive()
+        self.assertTrue(diagnosis.active)
+
+    def test_mentor_approval_queue(self):
+        """
+        Test that a mentor sees the pending diagnoses of their interns and
+        approves them in one batch, that nobody else can approve them, and
+        that the approval rule is checked for the whole batch.
+        """
+        Diagnosis = self.env["hr.hospital.diagnosis"]
+        visit = self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.doctor.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": datetime.now() + timedelta(days=2),
+            }
+        )
+        pending = Diagnosis.create(
+            [
+                {"visit_id": visit.id, "disease_id": self.disease.id}
+                for _index in range(3)
+            ]
+        )
+        # the visit is handed over to the intern: its diagnoses now wait
+        # for the mentor
+        visit.doctor_id = self.intern
+        approved = Diagnosis.create(
+            {"visit_id": self.visit.id, "disease_id": self.disease.id, "approved": True}
+        )
+
+        mentor = Diagnosis.with_user(self.user_doctor)
+        action = mentor.action_open_approval_queue()
+        queue = mentor.search(action["domain"])
+        self.assertEqual(queue, pending)
+        intern = Diagnosis.with_user(self.user_intern)
+        self.assertFalse(intern.search(intern.action_open_approval_queue()["domain"]))
+        self.assertEqual(self.intern.pending_diagnosis_count, len(pending))
+
+        with self.assertRaises(ValidationError):
+            (pending | approved).write({"approved": False})
+
+        # neither the intern nor a doctor who is not their mentor can approve
+        other_mentor = new_test_user(
+            self.env, login="other_mentor", groups="hr_hospital.group_doctor"
+        )
+        for user in (self.user_intern, other_mentor):
+            pending.with_user(user).action_approve()
+            self.assertFalse(any(pending.mapped("approved")))
+
+        queue.action_approve()
+        self.assertTrue(all(pending.mapped("approved")))
+        self.assertFalse(mentor.search(action["domain"]))
+        self.assertEqual(self.intern.pending_diagnosis_count, 0)
+
+    def test_doctor_report_job(self):
+        """
+        Test that doctor reports are rendered in the background, cached
+        privately for their user, rendered again only for doctors whose
+        visits changed, and kept by the jobs that served them.
+        """
+        doctors = self.doctor | self.intern
+        # namesake doctors still get one report each in the zip file
+        self.intern.write(
+            {"first_name": self.doctor.first_name, "last_name": self.doctor.last_name}
+        )
+        action = doctors.action_print_report_background()
+        job = self.env["hr.hospital.report.job"].browse(action["res_id"])
+        self.assertEqual(job.state, "queued")
+        self.assertEqual(job.pending_doctor_ids, doctors)
+
+        job._cron_process()
+        self.assertEqual(job.state, "done")
+        self.assertEqual(job.rendered_count, 2)
+        self.assertEqual(len(job.attachment_ids), 2)
+        self.assertEqual(set(job.attachment_ids.mapped("res_id")), {job.id})
+        with zipfile.ZipFile(io.BytesIO(job.result_id.raw)) as archive:
+            self.assertEqual(len(set(archive.namelist())), 2)
+
+        # cached reports are only visible to their user
+        Cache = self.env["hr.hospital.report.cache"]
+        cached = Cache.search([("user_id", "=", job.user_id.id)])
+        self.assertEqual(cached.doctor_id, doctors)
+        self.assertFalse(Cache.with_user(self.user_doctor).search([]))
+        with self.assertRaises(AccessError):
+            cached[0].attachment_id.with_user(self.user_doctor).check("read")
+
+        # unchanged doctors are served from the cache at once
+        action = doctors.action_print_report_background()
+        self.assertEqual(action["type"], "ir.actions.act_url")
+
+        self.env["hr.hospital.visit"].create(
+            {
+                "doctor_id": self.intern.id,
+                "patient_id": self.patient.id,
+                "planned_datetime": datetime.now() + timedelta(days=4),
+            }
+        )
+        first = job
+        action = doctors.action_print_report_background()
+        job = self.env["hr.hospital.report.job"].browse(action["res_id"])
+        self.assertEqual(job.pending_doctor_ids, self.intern)
+        self.assertEqual(
+            job.attachment_ids.name,
+            f"Doctor Report - {self.doctor.name} ({self.doctor.id}).pdf",
+        )
+        job._cron_process()
+        self.assertEqual(job.state, "done")
+        self.assertEqual(len(first.attachment_ids.exists()), 2)
+        self.assertTrue(first.result_id.exists())
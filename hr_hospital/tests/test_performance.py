@@ -0,0 +1,277 @@
+import logging
+
+from odoo.tests.common import tagged
+from odoo.tools import SQL
+
+from ..models import profiling
+from .data_generator import generate_hospital_data
+from .test_common import HospitalCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("-at_install", "post_install")
+class TestPerformance(HospitalCommon):
+    """
+    Query-count and query-plan benchmarks for the HR Hospital module.
+
+    These tests make sure that hot paths issue a constant number of queries
+    regardless of how many records they process, and that their queries are
+    served by indexes on a large dataset, so regressions fail early.
+    """
+
+    def _count_queries(self, func):
+        """
+        Run `func` on a cold cache and return the number of executed queries.
+        """
+        self.env.invalidate_all()
+        start = self.env.cr.sql_log_count
+        func()
+        return self.env.cr.sql_log_count - start
+
+    def _create_patients_with_diagnoses(self, count):
+        """
+        Create `count` patients, each with one visit and one diagnosis.
+        """
+        patients = self.env["hr.hospital.patient"].create(
+            [
+                {"first_name": f"Bench{index}", "last_name": "Patient"}
+                for index in range(count)
+            ]
+        )
+        visits = self.env["hr.hospital.visit"].create(
+            [
+                {"doctor_id": self.doctor.id, "patient_id": patient.id}
+                for patient in patients
+            ]
+        )
+        self.env["hr.hospital.diagnosis"].create(
+            [{"visit_id": visit.id, "disease_id": self.disease.id} for visit in visits]
+        )
+        return patients
+
+    def test_patient_diagnosis_history_query_count(self):
+        """
+        Reading the diagnosis history must not issue one query per patient.
+        """
+        few = self._create_patients_with_diagnoses(2)
+        many = self._create_patients_with_diagnoses(40)
+
+        def read_history(patients):
+            return lambda: patients.read(["diagnosis_ids"])
+
+        few_count = self._count_queries(read_history(few))
+        many_count = self._count_queries(read_history(many))
+        self.assertEqual(few_count, many_count)
+        self.assertEqual(len(many.diagnosis_ids), 40)
+
+    def _assert_query_budgets(self, stats, budgets):
+        """
+        Assert that every profiled method stayed within its per-call query budget.
+        """
+        for method, budget in budgets.items():
+            with self.subTest(method=method):
+                self.assertIn(method, stats)
+                entry = stats[method]
+                self.assertLessEqual(entry["queries"] / entry["calls"], budget)
+
+    def test_constraint_query_budgets(self):
+        """
+        The visit and diagnosis constraints must cost a constant number of
+        queries per call, whatever the size of the validated batch.
+        """
+        budgets = {
+            "hr.hospital.visit._check_duplicate_visit": 3,
+            "hr.hospital.visit._check_visit_constraints": 2,
+            "hr.hospital.diagnosis._check_approval_rights": 4,
+        }
+        for size in (1, 50):
+            patients = self.env["hr.hospital.patient"].create(
+                [
+                    {"first_name": "Budget", "last_name": f"Patient {index}"}
+                    for index in range(size)
+                ]
+            )
+            self.env.invalidate_all()
+            with profiling.collect() as stats:
+                visits = self.env["hr.hospital.visit"].create(
+                    [
+                        {
+                            "doctor_id": self.doctor.id,
+                            "patient_id": patient.id,
+                            "planned_datetime": self.visit.planned_datetime,
+                        }
+                        for patient in patients
+                    ]
+                )
+                self.env["hr.hospital.diagnosis"].create(
+                    [
+                        {"visit_id": visit.id, "disease_id": self.disease.id}
+                        for visit in visits
+                    ]
+                )
+            self._assert_query_budgets(stats, budgets)
+
+    def _seed_visits(self, doctors=200, patients=2000, visits=20000):
+        """
+        Seed a large dataset with the synthetic data generator.
+        """
+        stats = generate_hospital_data(
+            self.env,
+            doctors=doctors,
+            patients=patients,
+            visits=visits,
+            days=2 * 365,
+        )
+        return stats["doctor_ids"], stats["patient_ids"]
+
+    def test_generated_data_is_consistent(self):
+        """
+        The seeded rows must hold what the ORM would store: no duplicate
+        visits, and the duplicate keys computed by the patient model.
+        """
+        doctor_ids, patient_ids = self._seed_visits(visits=5000)
+        self.env.cr.execute(
+            """
+            SELECT 1
+              FROM hr_hospital_visit
+             WHERE doctor_id IN %s
+             GROUP BY doctor_id, patient_id, planned_date
+            HAVING count(*) > 1
+            """,
+            [tuple(doctor_ids)],
+        )
+        self.assertFalse(self.env.cr.fetchall())
+        patients = self.env["hr.hospital.patient"].browse(patient_ids[:50])
+        seeded = patients.read(["passport_key", "identity_key"])
+        patients._compute_duplicate_keys()
+        self.assertEqual(patients.read(["passport_key", "identity_key"]), seeded)
+
+    def _explain(self, query):
+        """
+        Return the execution plan of the SQL object `query` as a single string.
+        """
+        self.env.cr.execute(SQL("EXPLAIN %s", query))
+        return "\n".join(row[0] for row in self.env.cr.fetchall())
+
+    def test_hot_queries_use_indexes(self):
+        """
+        The visit and diagnosis access patterns used by the record rules,
+        the calendar, the reports and the diagnosis wizard must use indexes.
+        """
+        doctor_ids, patient_ids = self._seed_visits()
+        week = ("2021-03-01", "2021-03-08")
+        queries = {
+            "doctor visits": SQL(
+                """
+                SELECT id FROM hr_hospital_visit
+                 WHERE doctor_id = %s
+                 ORDER BY planned_datetime DESC LIMIT 80
+                """,
+                doctor_ids[0],
+            ),
+            "patient history": SQL(
+                """
+                SELECT id FROM hr_hospital_visit
+                 WHERE patient_id = %s AND planned_datetime >= %s
+                """,
+                patient_ids[0],
+                week[0],
+            ),
+            "calendar window": SQL(
+                """
+                SELECT id FROM hr_hospital_visit
+                 WHERE planned_datetime >= %s AND planned_datetime < %s
+                """,
+                *week,
+            ),
+            "visit diagnoses": SQL(
+                "SELECT id FROM hr_hospital_diagnosis WHERE visit_id = %s",
+                self.visit.id,
+            ),
+            "diagnosis report window": SQL(
+                """
+                SELECT id FROM hr_hospital_diagnosis
+                 WHERE diagnosis_date >= %s AND diagnosis_date <= %s
+                """,
+                *week,
+            ),
+        }
+        for name, query in queries.items():
+            with self.subTest(query=name):
+                self.assertIn("Index", self._explain(query))
+
+    def test_patient_lookup_uses_trigram_indexes(self):
+        """
+        The patient quick search on name, phone and passport must be served
+        by the trigram indexes, not by a sequential scan.
+        """
+        if not self.env.registry.has_trigram:
+            self.skipTest("The pg_trgm extension is not available.")
+        self._seed_visits()
+        self.env.cr.execute("ANALYZE hr_hospital_patient")
+        # the seeded table is small: make sure the index is usable at all
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        patients = self.env["hr.hospital.patient"]
+        for term in ("No. 12", "0001234", "PP0000"):
+            with self.subTest(term=term):
+                query = patients._search(
+                    [
+                        "|",
+                        "|",
+                        ("name", "ilike", term),
+                        ("phone", "ilike", term),
+                        ("passport_data", "ilike", term),
+                    ]
+                )
+                plan = self._explain(query.select())
+                self.assertNotIn("Seq Scan on hr_hospital_patient", plan)
+                self.assertIn("Bitmap Index Scan", plan)
+
+    def test_doctor_rule_list_latency(self):
+        """
+        Benchmark the visit list of a mentor and of an intern on a large dataset.
+
+        Half of the seeded doctors become interns of the mentor, whose rule
+        then matches their visits through the stored access column.
+        """
+        doctor_ids, _patient_ids = self._seed_visits()
+        interns = tuple(doctor_ids[: len(doctor_ids) // 2])
+        cr = self.env.cr
+        cr.execute(
+            """
+            UPDATE hr_hospital_doctor SET is_intern = TRUE, mentor_id = %s
+             WHERE id IN %s
+            """,
+            [self.doctor.id, interns],
+        )
+        cr.execute(
+            """
+            INSERT INTO hr_hospital_visit_access_user_rel (visit_id, user_id)
+            SELECT id, %s FROM hr_hospital_visit WHERE doctor_id IN %s
+            """,
+            [self.user_doctor.id, interns],
+        )
+        cr.execute("ANALYZE hr_hospital_visit_access_user_rel")
+        self.env.invalidate_all()
+        for user in (self.user_doctor, self.user_intern):
+            visits = self.env["hr.hospital.visit"].with_user(user)
+            with profiling.collect() as stats:
+                visits.search([], limit=80, order="planned_datetime desc")
+                count = visits.search_count([])
+            fetch = stats["hr.hospital.visit.search_fetch"]
+            counting = stats["hr.hospital.visit.search_count"]
+            _logger.info(
+                "Visit list for %s: %s visits, fetch %.1f ms, count %.1f ms",
+                user.login,
+                count,
+                fetch["time"] * 1000,
+                counting["time"] * 1000,
+            )
+        cr.execute(
+            "SELECT COUNT(*) FROM hr_hospital_visit WHERE doctor_id IN %s", [interns]
+        )
+        self.assertEqual(
+            self.env["hr.hospital.visit"].with_user(self.user_doctor).search_count([]),
+            cr.fetchone()[0] + 1,
+        )
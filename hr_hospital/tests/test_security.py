@@ -1,5 +1,5 @@
 from odoo.exceptions import AccessError
-from odoo.tests.common import tagged
+from odoo.tests.common import new_test_user, tagged
 
 from .test_common import HospitalCommon
 
@@ -81,6 +81,32 @@ class TestAccessRights(HospitalCommon):
         )
         self.assertEqual(count, 1)
 
+    def test_doctor_access_follows_mentor_change(self):
+        """
+        Ensure that visit visibility follows the intern's mentor when it changes.
+        The previous mentor loses access, the new one gains it.
+        """
+        user_other = new_test_user(
+            self.env,
+            login="doctor_other_mentor",
+            groups="hr_hospital.group_doctor",
+        )
+        other_mentor = (
+            self.env["hr.hospital.doctor"]
+            .sudo()
+            .create(
+                {
+                    "first_name": "Carol",
+                    "last_name": "Mentor",
+                    "user_id": user_other.id,
+                }
+            )
+        )
+        self.intern.sudo().mentor_id = other_mentor
+        visits = self.env["hr.hospital.visit"]
+        self.assertEqual(visits.with_user(user_other.id).search_count([]), 1)
+        self.assertEqual(visits.with_user(self.user_doctor.id).search_count([]), 0)
+
     def test_manager_read_all_but_no_write(self):
         """
         Ensure that hospital manager has read-only access to all visits.
@@ -1 +1 @@
-from . import diagnosis_report_wizard, patient_doctor_update_wizard
+from . import diagnosis_report_wizard, import_wizard, patient_doctor_update_wizard
@@ -1,5 +1,7 @@
 from odoo import fields, models
 
+from ..models.profiling import profiled
+
 
 class DiagnosisReportWizard(models.TransientModel):
     """
@@ -10,8 +12,9 @@ class DiagnosisReportWizard(models.TransientModel):
     - Selected diseases
     - Visit date range (from / to)
 
-    It is used to quickly analyze diagnoses via various views:
-    tree, form, pivot, graph.
+    Its main button opens the pivot and graph of the pre-aggregated
+    `hr.hospital.diagnosis.analysis`; the matching diagnoses themselves are
+    listed for drill-down and exported from here.
     """
 
     _name = "hr.hospital.diagnosis.report.wizard"
@@ -19,45 +22,125 @@ class DiagnosisReportWizard(models.TransientModel):
 
     doctor_ids = fields.Many2many("hr.hospital.doctor")
     disease_ids = fields.Many2many("hr.hospital.disease")
+    include_sub_diseases = fields.Boolean(
+        help="Also include diagnoses of all diseases under the selected ones."
+    )
     date_from = fields.Date()
     date_to = fields.Date()
 
-    def get_diagnosis_records(self):
+    def _get_diagnosis_domain(self):
         """
-        Returns an action that opens a view with filtered diagnosis records
-        based on the criteria provided in the wizard.
+        Return the domain of the diagnoses matching the wizard criteria.
 
         Filters applied:
         - Doctor(s)
-        - Disease(s)
+        - Disease(s), optionally with their whole subtree
         - Visit actual date between `date_from` and `date_to`
-
-        :return: dict representing an ir.actions.act_window action
         """
         domain = []
         if self.doctor_ids:
             domain += [("visit_id.doctor_id", "in", self.doctor_ids.ids)]
         if self.disease_ids:
-            domain += [("disease_id", "in", self.disease_ids.ids)]
+            operator = "child_of" if self.include_sub_diseases else "in"
+            domain += [("disease_id", operator, self.disease_ids.ids)]
         if self.date_from:
-            domain += [("visit_id.actual_datetime", ">=", self.date_from)]
+            domain += [
+                (
+                    "visit_id.actual_datetime",
+                    ">=",
+                    fields.Date.to_string(self.date_from),
+                )
+            ]
         if self.date_to:
-            domain += [("visit_id.actual_datetime", "<=", self.date_to)]
+            domain += [
+                ("visit_id.actual_datetime", "<=", fields.Date.to_string(self.date_to))
+            ]
+        return domain
+
+    @profiled
+    def get_diagnosis_records(self):
+        """
+        Returns an action that lists the diagnosis records matching the
+        criteria provided in the wizard, for drill-down.
+
+        Statistics are read from the analysis (`get_diagnosis_analysis`)
+        rather than grouped over the diagnoses themselves.
+
+        :return: dict representing an ir.actions.act_window action
+        """
+        domain = self._get_diagnosis_domain()
 
         return {
             "type": "ir.actions.act_window",
             "name": "Filtered Diagnoses",
             "res_model": "hr.hospital.diagnosis",
-            "view_mode": "tree,form,pivot,graph",
+            "view_mode": "tree,form",
             "views": [
                 (self.env.ref("hr_hospital.view_diagnosis_tree_for_report").id, "tree"),
                 (False, "form"),
-                (False, "pivot"),
-                (False, "graph"),
             ],
             "domain": domain,
+            "target": "current",
+        }
+
+    @profiled
+    def get_diagnosis_analysis(self):
+        """
+        Returns an action that opens the pre-aggregated diagnosis analysis
+        restricted to the criteria provided in the wizard.
+
+        The analysis is kept fresh by the "Refresh Diagnosis Analysis"
+        scheduled action, which is triggered here so that pending changes are
+        aggregated soon, without re-aggregating them in the request.
+
+        :return: dict representing an ir.actions.act_window action
+        """
+        analysis = self.env["hr.hospital.diagnosis.analysis"]
+        self.env.ref("hr_hospital.ir_cron_refresh_diagnosis_analysis")._trigger()
+        domain = []
+        if self.doctor_ids:
+            domain += [("doctor_id", "in", self.doctor_ids.ids)]
+        if self.disease_ids:
+            operator = "child_of" if self.include_sub_diseases else "in"
+            domain += [("disease_id", operator, self.disease_ids.ids)]
+        if self.date_from:
+            domain += [("date", ">=", self.date_from)]
+        if self.date_to:
+            domain += [("date", "<=", self.date_to)]
+
+        return {
+            "type": "ir.actions.act_window",
+            "name": "Diagnosis Analysis",
+            "res_model": analysis._name,
+            "view_mode": "pivot,graph",
+            "search_view_id": self.env.ref(
+                "hr_hospital.view_diagnosis_analysis_search"
+            ).id,
+            "domain": domain,
             "context": {
                 "group_by": "disease_id",
             },
             "target": "current",
         }
+
+    def action_export_csv(self):
+        """
+        Returns an action downloading the filtered diagnoses as a CSV file,
+        streamed without loading the records in memory.
+
+        :return: dict representing an ir.actions.act_url action
+        """
+        return self.env["hr.hospital.export"].get_export_action(
+            "diagnosis", self._get_diagnosis_domain(), "csv"
+        )
+
+    def action_export_xlsx(self):
+        """
+        Returns an action downloading the filtered diagnoses as an XLSX file,
+        written without loading the records in memory.
+
+        :return: dict representing an ir.actions.act_url action
+        """
+        return self.env["hr.hospital.export"].get_export_action(
+            "diagnosis", self._get_diagnosis_domain(), "xlsx"
+        )
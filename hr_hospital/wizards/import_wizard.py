@@ -0,0 +1,79 @@
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+
+
+class HospitalImportWizard(models.TransientModel):
+    """
+    A wizard uploading a CSV or JSON Lines file of patients, visits or
+    diagnoses and queuing its import.
+
+    The file is stored as an attachment of a new `hr.hospital.import.job`,
+    imported in chunks by the "Import Data" scheduled action instead of in
+    the HTTP request.
+    """
+
+    _name = "hr.hospital.import.wizard"
+    _description = "Import hospital data"
+
+    res_model = fields.Selection(
+        [
+            ("hr.hospital.patient", "Patients"),
+            ("hr.hospital.visit", "Visits"),
+            ("hr.hospital.diagnosis", "Diagnoses"),
+        ],
+        string="Import",
+        required=True,
+        default="hr.hospital.patient",
+    )
+    file = fields.Binary(required=True)
+    filename = fields.Char()
+    file_format = fields.Selection(
+        [("csv", "CSV"), ("jsonl", "JSON Lines")],
+        compute="_compute_file_format",
+        store=True,
+        readonly=False,
+        required=True,
+    )
+    chunk_size = fields.Integer(default=1000, required=True)
+
+    @api.depends("filename")
+    def _compute_file_format(self):
+        """
+        Guess the file format from the file name extension.
+        """
+        for wiz in self:
+            name = (wiz.filename or "").lower()
+            wiz.file_format = "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+    def action_import(self):
+        """
+        Queue the import of the file for the scheduled action.
+
+        Returns:
+            dict: An action opening the queued import job.
+        """
+        self.ensure_one()
+        if self.chunk_size < 1:
+            raise UserError(_("The chunk size must be positive."))
+        name = self.filename or _("Import")
+        attachment = self.env["ir.attachment"].create(
+            {"name": name, "datas": self.file}
+        )
+        job = self.env["hr.hospital.import.job"].create(
+            {
+                "name": name,
+                "res_model": self.res_model,
+                "file_format": self.file_format,
+                "chunk_size": self.chunk_size,
+                "attachment_id": attachment.id,
+            }
+        )
+        attachment.write({"res_model": job._name, "res_id": job.id})
+        self.env.ref("hr_hospital.ir_cron_import_data")._trigger()
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": job._name,
+            "res_id": job.id,
+            "view_mode": "form",
+            "target": "current",
+        }